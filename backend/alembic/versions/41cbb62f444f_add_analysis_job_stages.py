@@ -0,0 +1,38 @@
+"""Add analysis_job_stages
+
+Revision ID: 41cbb62f444f
+Revises: 5fbd3b604646
+Create Date: 2026-10-18 11:03:27.551930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '41cbb62f444f'
+down_revision: Union[str, Sequence[str], None] = '5fbd3b604646'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One row per (job, stage) so each pipeline stage writes only its own
+    # output instead of rewriting the whole analysis_jobs.result blob.
+    op.create_table(
+        'analysis_job_stages',
+        sa.Column('job_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('analysis_jobs.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('stage', sa.String(), primary_key=True),
+        sa.Column('data', postgresql.JSONB(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('analysis_job_stages')
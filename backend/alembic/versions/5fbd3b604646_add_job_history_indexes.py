@@ -0,0 +1,57 @@
+"""Add job history indexes
+
+Revision ID: 5fbd3b604646
+Revises: 7bad611f5ad5
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5fbd3b604646'
+down_revision: Union[str, Sequence[str], None] = '7bad611f5ad5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Composite indexes backing keyset pagination on (created_at, id), optionally
+# filtered by ticker or status. Btree indexes serve the DESC ordering via
+# backward scans.
+INDEXES = [
+    ('ix_analysis_jobs_created_at_id', ['created_at', 'id']),
+    ('ix_analysis_jobs_ticker_created_at_id', ['ticker', 'created_at', 'id']),
+    ('ix_analysis_jobs_status_created_at_id', ['status', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The initial revision is empty because the table used to be created by
+    # Base.metadata.create_all(); create it here for databases that never ran the app.
+    if not sa.inspect(op.get_bind()).has_table('analysis_jobs'):
+        op.create_table(
+            'analysis_jobs',
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+            sa.Column('ticker', sa.String(), nullable=False),
+            sa.Column('status', sa.String(), nullable=False),
+            sa.Column('result', sa.JSON(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('ix_analysis_jobs_ticker', 'analysis_jobs', ['ticker'])
+
+    # CONCURRENTLY can't run inside a transaction, and avoids blocking job
+    # inserts while the indexes build on a large table.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'analysis_jobs', columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='analysis_jobs', postgresql_concurrently=True, if_exists=True)
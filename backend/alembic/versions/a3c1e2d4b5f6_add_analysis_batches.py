@@ -0,0 +1,47 @@
+"""Add analysis_batches
+
+Revision ID: a3c1e2d4b5f6
+Revises: 41cbb62f444f
+Create Date: 2026-10-18 15:41:09.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c1e2d4b5f6'
+down_revision: Union[str, Sequence[str], None] = '41cbb62f444f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Watchlist batches (POST /batches); each ticker still gets its own job row
+    op.create_table(
+        'analysis_batches',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('tickers', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    # IF NOT EXISTS: the app's create_all() may already have added the column
+    op.execute(
+        'ALTER TABLE analysis_jobs ADD COLUMN IF NOT EXISTS batch_id UUID '
+        'REFERENCES analysis_batches (id) ON DELETE SET NULL'
+    )
+    op.create_index('ix_analysis_jobs_batch_id', 'analysis_jobs', ['batch_id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_analysis_jobs_batch_id', table_name='analysis_jobs', if_exists=True)
+    op.drop_column('analysis_jobs', 'batch_id')
+    op.drop_table('analysis_batches')
@@ -1,12 +1,21 @@
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init
 from core.config import settings
+from datetime import timedelta
+import gc
+import os
 
 celery = Celery(
     "quantitative_analysis_platform",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
     include=[
-        "tasks.main_task"
+        "tasks.main_task",
+        "tasks.batch_task",
+        "tasks.prewarm_task",
+        "tasks.prediction_tasks",
+        "tasks.sentiment_tasks",
     ]
 )
 
@@ -16,4 +25,95 @@ celery.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
-)
\ No newline at end of file
+)
+
+# Separate queues so CPU-bound work can't starve the I/O pipeline:
+#   io        - scraping, yfinance, DB and LLM calls; mostly waiting on the
+#               network, so served by a high-concurrency thread pool:
+#                 celery -A celery_worker.celery worker -Q io --pool threads --concurrency 32
+#   cpu       - forecast fitting; one prefork process per core (Celery's
+#               default concurrency):
+#                 celery -A celery_worker.celery worker -Q cpu --pool prefork
+#   sentiment - headline scoring; one process per node with a thread pool,
+#               so concurrent requests from many jobs meet in one
+#               SentimentBatcher and share forward passes:
+#                 celery -A celery_worker.celery worker -Q sentiment --pool threads --concurrency 16
+# A single worker can still serve all of them with -Q io,cpu,sentiment (WORKER_ROLE=all).
+celery.conf.update(
+    task_default_queue="io",
+    task_routes={
+        "tasks.prediction_tasks.*": {"queue": "cpu"},
+        "tasks.sentiment_tasks.*": {"queue": "sentiment"},
+    },
+    # Don't let a cpu process reserve fits it can't start yet while others idle
+    worker_prefetch_multiplier=1,
+)
+
+def preopen_schedule() -> crontab:
+    """PREWARM_PREOPEN_TIME (IST) on NSE trading days, as a UTC crontab for beat."""
+    hour, minute = map(int, settings.PREWARM_PREOPEN_TIME.split(":"))
+    # IST is UTC+5:30 with no DST; before 05:30 IST it is still the previous day in UTC
+    minutes = hour * 60 + minute - 330
+    day_of_week = "mon-fri" if minutes >= 0 else "sun-thu"
+    minutes %= 24 * 60
+    return crontab(hour=minutes // 60, minute=minutes % 60, day_of_week=day_of_week)
+
+# Run with: celery -A celery_worker.celery beat
+if settings.PREWARM_TICKERS:
+    celery.conf.beat_schedule = {
+        "prewarm-before-open": {
+            "task": "tasks.prewarm_task.prewarm_universe",
+            "schedule": preopen_schedule(),
+        },
+        "prewarm-during-session": {
+            "task": "tasks.prewarm_task.prewarm_universe",
+            "schedule": timedelta(minutes=settings.PREWARM_INTERVAL_MINUTES),
+            "kwargs": {"only_when_live": True},
+        },
+    }
+
+def memory_usage_mb() -> dict:
+    """
+    Memory of the current process in MB, read from /proc (Linux only).
+    Pss splits shared pages between the processes mapping them, so it is the
+    real per-child cost once the model pages are shared after fork.
+    """
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Private_Dirty"):
+                    usage[key] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return usage
+
+@worker_init.connect
+def preload_sentiment_model(**kwargs):
+    """
+    Runs in the parent worker process before the prefork pool starts, so the
+    model is loaded once and children share its pages copy-on-write. The worker
+    doesn't consume tasks until this returns, so no job ever hits a cold model.
+    """
+    if not settings.PRELOAD_SENTIMENT_MODEL or settings.WORKER_ROLE not in ("all", "sentiment"):
+        return
+    from tools.sentiment_tools import load_sentiment_pipeline
+
+    print(f"Preloading sentiment model in worker parent (pid {os.getpid()}), memory before: {memory_usage_mb()}")
+    load_sentiment_pipeline()
+    # Move everything allocated so far out of the GC's reach; otherwise the
+    # collector's bookkeeping writes would un-share these pages in every child.
+    gc.freeze()
+    print(f"Sentiment model preloaded, memory after: {memory_usage_mb()}")
+
+@worker_process_init.connect
+def ensure_sentiment_model(**kwargs):
+    """Readiness check in each pool child: load here only if the parent didn't."""
+    from tools.sentiment_tools import load_sentiment_pipeline, is_sentiment_pipeline_ready
+
+    if settings.WORKER_ROLE not in ("all", "sentiment"):
+        return  # inference runs on the sentiment queue
+    if not is_sentiment_pipeline_ready():
+        load_sentiment_pipeline()
+    print(f"Worker child {os.getpid()} ready with sentiment model, memory: {memory_usage_mb()}")
@@ -0,0 +1,211 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import redis
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client: Optional[redis.Redis] = None
+_redis_lock = threading.Lock()
+
+def get_redis() -> redis.Redis:
+    """
+    Shared Redis client for the cache tiers. redis-py's connection pool checks
+    the pid, so it is safe to create before the Celery pool forks.
+    """
+    global _redis_client
+    with _redis_lock:
+        if _redis_client is None:
+            _redis_client = redis.Redis.from_url(settings.REDIS_CACHE_URL, socket_timeout=2, socket_connect_timeout=2)
+        return _redis_client
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+class TieredCache:
+    """
+    Two-tier cache: an in-process LRU in front of a shared Redis namespace.
+    Values must be JSON-serializable. Redis errors are logged and treated as
+    misses, so a Redis outage only costs recomputation.
+    """
+
+    def __init__(self, namespace: str, max_size: int, ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRUCache(max_size, ttl)
+        self.stats_lock = threading.Lock()
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0, "redis_errors": 0, "coalesced": 0}
+        self.inflight: Dict[str, Future] = {}
+        self.inflight_lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1):
+        if amount:
+            with self.stats_lock:
+                self.counters[name] += amount
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        remote_keys = []
+        for key in dict.fromkeys(keys):
+            value = self.local.get(key)
+            if value is None:
+                remote_keys.append(key)
+            else:
+                found[key] = value
+        self._count("local_hits", len(found))
+
+        if remote_keys:
+            try:
+                raw_values = get_redis().mget([self._redis_key(k) for k in remote_keys])
+            except redis.RedisError as e:
+                logger.warning(f"Redis read for cache '{self.namespace}' failed: {e}")
+                self._count("redis_errors")
+                raw_values = [None] * len(remote_keys)
+            redis_hits = 0
+            for key, raw in zip(remote_keys, raw_values):
+                if raw is not None:
+                    value = json.loads(raw)
+                    self.local.set(key, value)
+                    found[key] = value
+                    redis_hits += 1
+            self._count("redis_hits", redis_hits)
+            self._count("misses", len(remote_keys) - redis_hits)
+        return found
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        ttl = ttl or self.ttl
+        for key, value in items.items():
+            self.local.set(key, value, ttl)
+        if not items:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(self._redis_key(key), json.dumps(value), ex=max(1, int(ttl)))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis write for cache '{self.namespace}' failed: {e}")
+            self._count("redis_errors")
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.set_many({key: value}, ttl)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       wait_timeout: float = 15.0) -> Any:
+        """
+        Returns the cached value, or computes and stores it. Concurrent callers
+        for the same key share one computation: threads in this process wait on
+        the same future, and other processes wait (up to wait_timeout) on a
+        short Redis lock held by whoever is computing. None is never cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self.inflight_lock:
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[key] = future
+        if not owner:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            value = self._compute_shared(key, compute, ttl, wait_timeout)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.inflight_lock:
+                self.inflight.pop(key, None)
+
+    def _compute_shared(self, key: str, compute: Callable[[], Any], ttl: Optional[float], wait_timeout: float) -> Any:
+        lock_key = f"lock:{self.namespace}:{key}"
+        token = uuid.uuid4().hex
+        try:
+            have_lock = bool(get_redis().set(lock_key, token, nx=True, ex=max(1, int(wait_timeout))))
+        except redis.RedisError as e:
+            logger.warning(f"Redis lock for cache '{self.namespace}' failed: {e}")
+            self._count("redis_errors")
+            have_lock = True  # can't coordinate, so just compute
+
+        if not have_lock:
+            # Another process is computing this key; wait for its result
+            self._count("coalesced")
+            deadline = time.monotonic() + wait_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.2)
+                try:
+                    raw = get_redis().get(self._redis_key(key))
+                    if raw is not None:
+                        value = json.loads(raw)
+                        self.local.set(key, value, ttl)
+                        return value
+                    if not get_redis().exists(lock_key):
+                        break
+                except redis.RedisError:
+                    break
+
+        try:
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            if have_lock:
+                try:
+                    # Only release the lock if it is still ours
+                    if get_redis().get(lock_key) == token.encode():
+                        get_redis().delete(lock_key)
+                except redis.RedisError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self.stats_lock:
+            counters = dict(self.counters)
+        lookups = counters["local_hits"] + counters["redis_hits"] + counters["misses"]
+        counters["hit_rate"] = round((lookups - counters["misses"]) / lookups, 3) if lookups else 0.0
+        return counters
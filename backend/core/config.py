@@ -2,14 +2,141 @@
 
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import List, Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
     GOOGLE_API_KEY: str
 
+    # Connection pool per engine (the API's async engine and each worker's sync engine)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
 
+    # POST /jobs reuses an in-flight job for the same ticker (if younger than
+    # JOB_INFLIGHT_MAX_AGE), or a SUCCESS job younger than JOB_FRESHNESS_SECONDS
+    JOB_FRESHNESS_SECONDS: int = 600
+    JOB_INFLIGHT_MAX_AGE: int = 900
+
+    # How long (seconds) the latest job snapshot is kept in Redis for streaming clients
+    JOB_EVENTS_TTL: int = 3600
+
+    # "parallel" overlaps the independent I/O stages of run_full_analysis,
+    # "sequential" runs them one after another (the original behaviour).
+    PIPELINE_MODE: str = "parallel"
+
+    # Batch (watchlist) jobs: the most tickers one batch may hold, and how many
+    # tickers are fetched / sent to the LLM at the same time
+    BATCH_MAX_TICKERS: int = 100
+    BATCH_FETCH_CONCURRENCY: int = 8
+    BATCH_LLM_CONCURRENCY: int = 4
+
+    # Default forecasting engine for prediction jobs: "prophet" (Stan-backed),
+    # or "numpy" (vectorized trend + seasonality least squares, see tools/forecast_engine.py)
+    FORECAST_ENGINE: str = "prophet"
+    # Fitted forecasts are kept per ticker and engine with the watermark of
+    # their training data; they are reused until a new or revised bar arrives
+    FORECAST_CACHE_TTL: int = 7 * 24 * 3600
+
+    # Overall budget (seconds) for gathering news from all sources
+    NEWS_FETCH_DEADLINE: float = 20.0
+    # How long (seconds) a ticker's collected articles are reused across jobs
+    NEWS_CACHE_TTL: int = 1800
+
+    # Cache pre-warming (Celery beat): PREWARM_TICKERS (e.g. '["RELIANCE","TCS"]')
+    # are refreshed at PREWARM_PREOPEN_TIME (IST) before NSE opens, and every
+    # PREWARM_INTERVAL_MINUTES while it trades. An empty universe disables it.
+    PREWARM_TICKERS: List[str] = []
+    PREWARM_PREOPEN_TIME: str = "08:30"
+    PREWARM_INTERVAL_MINUTES: int = 20
+    # Pause between tickers, on top of the per-host rate limits; doubled (up
+    # to PREWARM_MAX_BACKOFF_SECONDS) whenever a source rate-limits us
+    PREWARM_PACING_SECONDS: float = 2.0
+    PREWARM_MAX_BACKOFF_SECONDS: float = 60.0
+
+    # Which Celery queues this worker serves (see celery_worker.py):
+    #   "all"       - one worker consumes every queue and does everything in-process
+    #   "io"        - thread-pool worker for the I/O stages; sentiment inference is
+    #                 sent to the sentiment queue, so no model is loaded here
+    #   "cpu"       - prefork worker, one process per core, for forecasting
+    #   "sentiment" - single-process thread-pool worker holding the model and
+    #                 the node's one SentimentBatcher
+    WORKER_ROLE: str = "all"
+    # Remote scoring is sent in chunks of SENTIMENT_MAX_BATCH_SIZE titles; this
+    # is how long (seconds) an io worker waits for each chunk
+    SENTIMENT_REMOTE_TIMEOUT: float = 60.0
+
+    # LLM gateway (core/llm_gateway.py). The concurrency and per-minute limits
+    # are shared by every process through Redis.
+    LLM_MODEL: str = "gemini-1.5-flash-latest"
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_REQUESTS_PER_MINUTE: int = 15
+    LLM_MAX_RETRIES: int = 4
+    # Longest a call may wait for a slot, and how long a crashed caller's slot stays taken
+    LLM_SLOT_TIMEOUT: float = 180.0
+    LLM_SLOT_LEASE_SECONDS: float = 120.0
+    LLM_REQUEST_TIMEOUT: float = 120.0
+    # Send LLM calls to a local fake server (python -m tools.fake_llm_server) instead of Gemini
+    LLM_FAKE_URL: Optional[str] = None
+
+    # Analyst report cache, keyed by the rendered prompt, model and temperature.
+    # Entries live LLM_CACHE_TTL seconds while NSE trades, until the next open otherwise.
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL: int = 900
+    # Near-duplicate mode: with the same price data, also reuse a report whose
+    # headlines overlap the new ones by at least the threshold (Jaccard)
+    LLM_CACHE_NEAR_DUPLICATE: bool = False
+    LLM_CACHE_NEAR_DUPLICATE_THRESHOLD: float = 0.8
+
+    # Estimated token budget for the analyst prompt; headlines that don't fit are left out
+    LLM_PROMPT_TOKEN_BUDGET: int = 1000
+
+    # Stream analyst reports: text goes to Redis (and SSE clients) as it arrives,
+    # and the job's llm_analysis row is rewritten every LLM_STREAM_FLUSH_CHARS
+    # new characters or LLM_STREAM_FLUSH_SECONDS, whichever comes first
+    LLM_STREAM_ENABLED: bool = True
+    LLM_STREAM_FLUSH_CHARS: int = 2000
+    LLM_STREAM_FLUSH_SECONDS: float = 5.0
+
+    # Sentiment model. Workers load it in the Celery parent before forking so
+    # the prefork children share the weights copy-on-write.
+    SENTIMENT_MODEL_PATH: str = "/code/sentiment_model"
+    PRELOAD_SENTIMENT_MODEL: bool = True
+    # "pytorch" (transformers pipeline) or "onnx" (INT8-quantized ONNX Runtime,
+    # falls back to pytorch if onnxruntime or the export is unavailable)
+    SENTIMENT_BACKEND: str = "pytorch"
+    SENTIMENT_ONNX_DIR: str = "/code/sentiment_model_onnx"
+    SENTIMENT_ONNX_THREADS: int = 0  # 0 lets ONNX Runtime decide
+
+    # Micro-batching: titles from concurrent jobs in one process are merged into
+    # batches of up to SENTIMENT_MAX_BATCH_SIZE, waiting at most SENTIMENT_MAX_WAIT_MS.
+    SENTIMENT_BATCHING_ENABLED: bool = True
+    SENTIMENT_MAX_BATCH_SIZE: int = 128
+    SENTIMENT_MAX_WAIT_MS: float = 25.0
+    # Forward-pass batch size inside the transformers pipeline
+    SENTIMENT_MODEL_BATCH_SIZE: int = 32
+
+    # Shared cache tier (separate DB from the Celery broker by default)
+    REDIS_CACHE_URL: str = "redis://localhost:6379/1"
+    # Headline -> sentiment cache: entries in the per-process LRU, and TTL (seconds)
+    SENTIMENT_CACHE_SIZE: int = 20000
+    SENTIMENT_CACHE_TTL: int = 7 * 24 * 3600
+
+    # yfinance cache: TTLs (seconds) while NSE is open; after the close entries
+    # live until the next session opens
+    MARKET_DATA_INFO_TTL: int = 60
+    MARKET_DATA_HISTORY_TTL: int = 300
+    MARKET_DATA_CACHE_SIZE: int = 500
+    # Local append-only store of daily OHLCV bars (one memory-mapped file per ticker)
+    OHLCV_STORE_ENABLED: bool = True
+    OHLCV_STORE_DIR: str = "/code/data/ohlcv"
+
+    # Use HTTP/2 for scraping when httpx[http2] is installed
+    HTTP2_ENABLED: bool = True
+
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding='utf-8', extra='ignore')
 
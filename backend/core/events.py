@@ -0,0 +1,94 @@
+import json
+import logging
+import time
+from typing import Callable, Optional
+
+import redis
+import redis.asyncio as redis_async
+
+from .cache import get_redis
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Workers publish every job state change on a per-job channel and keep the
+# latest one in a snapshot key, so streaming clients never need the database.
+TERMINAL_STATUSES = ("SUCCESS", "FAILED")
+
+def job_channel(job_id) -> str:
+    return f"job-events:{job_id}"
+
+def job_snapshot_key(job_id) -> str:
+    return f"job-snapshot:{job_id}"
+
+def job_report_key(job_id) -> str:
+    return f"job-report:{job_id}"
+
+def serialize_job(job) -> Optional[str]:
+    """The job exactly as GET /jobs/{id} would return it, or None if it doesn't validate."""
+    import schemas
+
+    try:
+        return schemas.Job.model_validate(job).model_dump_json()
+    except ValueError as e:
+        logger.warning(f"Could not serialize job {job.id} for streaming: {e}")
+        return None
+
+def publish_job_update(job_id, payload: Optional[str]):
+    """
+    Stores `payload` as the job's snapshot and publishes it. Failures are
+    logged and ignored: the database stays the source of truth.
+    """
+    if payload is None:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.set(job_snapshot_key(job_id), payload, ex=settings.JOB_EVENTS_TTL)
+        pipe.publish(job_channel(job_id), payload)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish update for job {job_id}: {e}")
+
+class ReportStream:
+    """
+    Callback for llm_gateway.generate(on_text=...). Every call gets the whole
+    text so far: it is stored under job_report_key and the new part is
+    published on the job channel as {"event": "report", "offset", "delta"}.
+    `flush` (which persists the text) runs every LLM_STREAM_FLUSH_CHARS new
+    characters or LLM_STREAM_FLUSH_SECONDS, whichever comes first.
+    """
+    def __init__(self, job_id, flush: Callable[[str], None]):
+        self.job_id = job_id
+        self.flush = flush
+        self.text = ""
+        self.flushed_length = 0
+        self.flushed_at = time.monotonic()
+
+    def __call__(self, text: str):
+        # A retried generation starts over, so its text no longer extends ours
+        offset = len(self.text) if text.startswith(self.text) else 0
+        if offset < self.flushed_length:
+            self.flushed_length = 0
+        self.text = text
+        event = json.dumps({"event": "report", "offset": offset, "delta": text[offset:]})
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.set(job_report_key(self.job_id), text, ex=settings.JOB_EVENTS_TTL)
+            pipe.publish(job_channel(self.job_id), event)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish report text for job {self.job_id}: {e}")
+
+        if (len(text) - self.flushed_length >= settings.LLM_STREAM_FLUSH_CHARS
+                or time.monotonic() - self.flushed_at >= settings.LLM_STREAM_FLUSH_SECONDS):
+            self.flush(text)
+            self.flushed_length, self.flushed_at = len(text), time.monotonic()
+
+_async_redis: Optional[redis_async.Redis] = None
+
+def get_async_redis() -> redis_async.Redis:
+    """Event-loop Redis client for the API process."""
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = redis_async.Redis.from_url(settings.REDIS_CACHE_URL)
+    return _async_redis
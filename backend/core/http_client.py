@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .config import settings
+
+# httpx is optional; with the h2 package installed it lets us speak HTTP/2
+try:
+    import httpx
+    import h2  # noqa: F401
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+}
+
+# Keep-alive connections kept open per host. Hosts not listed get the default.
+HOST_POOL_SIZES = {
+    'www.reddit.com': 4,
+    'news.google.com': 4,
+}
+DEFAULT_POOL_SIZE = 8
+
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A host's Retry-After is honoured up to this many seconds. Longer waits would
+# hold the scraper thread (and its per-host slot) well past the fetch deadline.
+MAX_RETRY_AFTER_SECONDS = 5.0
+
+# --- Pool statistics ---
+class PoolStats:
+    """Counts requests vs. newly opened connections, and time spent in TCP+TLS handshakes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.handshake_seconds = 0.0
+
+    def record_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def record_connect(self, seconds: float):
+        with self.lock:
+            self.connections_opened += 1
+            self.handshake_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            reused = max(0, self.requests - self.connections_opened)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": reused,
+                "reuse_rate": round(reused / self.requests, 3) if self.requests else 0.0,
+                "handshake_seconds_total": round(self.handshake_seconds, 3),
+                "avg_handshake_ms": round(1000 * self.handshake_seconds / self.connections_opened, 1) if self.connections_opened else 0.0,
+            }
+
+_stats = PoolStats()
+
+# --- requests/urllib3 backend (HTTP/1.1) ---
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _stats.record_connect(time.perf_counter() - started)
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()  # TCP connect + TLS handshake
+        _stats.record_connect(time.perf_counter() - started)
+
+class _StatsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+    def urlopen(self, *args, **kwargs):
+        _stats.record_request()
+        return super().urlopen(*args, **kwargs)
+
+class _StatsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+    def urlopen(self, *args, **kwargs):
+        _stats.record_request()
+        return super().urlopen(*args, **kwargs)
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _StatsHTTPConnectionPool,
+            "https": _StatsHTTPSConnectionPool,
+        }
+
+class _CappedRetry(Retry):
+    """urllib3 Retry whose Retry-After sleeps are clamped to MAX_RETRY_AFTER_SECONDS."""
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER_SECONDS)
+
+# One retry policy for both backends: urllib3 applies it to the requests
+# session, and PooledHttpClient.get follows it by hand for httpx.
+RETRY_POLICY = _CappedRetry(
+    total=MAX_RETRIES,
+    backoff_factor=BACKOFF_FACTOR,
+    status_forcelist=RETRY_STATUSES,
+    allowed_methods=["GET", "HEAD"],
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+def retry_delay(retry_number: int, retry_after: Optional[str] = None) -> float:
+    """
+    Seconds RETRY_POLICY sleeps before retry `retry_number` (1-based): the
+    host's capped Retry-After when it sent one, else urllib3's backoff (none
+    before the first retry, then BACKOFF_FACTOR * 2 ** (n - 1)).
+    """
+    if retry_after:
+        try:
+            seconds = RETRY_POLICY.parse_retry_after(retry_after)
+        except InvalidHeader:
+            seconds = 0
+        if seconds:
+            return min(seconds, MAX_RETRY_AFTER_SECONDS)
+    return 0.0 if retry_number <= 1 else BACKOFF_FACTOR * 2 ** (retry_number - 1)
+
+def _build_requests_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+
+    default_adapter = _PooledAdapter(pool_connections=len(HOST_POOL_SIZES) + 8, pool_maxsize=DEFAULT_POOL_SIZE, max_retries=RETRY_POLICY)
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+    # requests picks the longest matching prefix, so these override the default per host
+    for host, pool_size in HOST_POOL_SIZES.items():
+        session.mount(f"https://{host}/", _PooledAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=RETRY_POLICY))
+    return session
+
+# --- httpx backend (HTTP/2) ---
+_trace_local = threading.local()
+
+def _httpx_trace(event_name: str, info: Dict[str, Any]):
+    # httpcore reports connection setup through these trace events
+    if event_name == "connection.connect_tcp.started":
+        _trace_local.connect_started = time.perf_counter()
+    elif event_name in ("connection.start_tls.complete", "connection.connect_tcp.failed"):
+        started = getattr(_trace_local, "connect_started", None)
+        if started is not None:
+            _stats.record_connect(time.perf_counter() - started)
+            _trace_local.connect_started = None
+
+class PooledHttpClient:
+    """
+    Process-wide HTTP client for the scrapers. Uses httpx with HTTP/2 when it is
+    installed and enabled, otherwise a requests Session with per-host urllib3 pools.
+    Both keep connections alive between jobs and retry transient failures
+    with the same policy (RETRY_POLICY).
+    """
+
+    def __init__(self):
+        self.http2 = settings.HTTP2_ENABLED and httpx is not None
+        if self.http2:
+            # HTTP/2 multiplexes requests, so one connection per host is usually enough
+            self._client = httpx.Client(
+                http2=True,
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=DEFAULT_POOL_SIZE * 4, max_keepalive_connections=DEFAULT_POOL_SIZE * 2),
+            )
+        else:
+            self._client = _build_requests_session()
+        logger.info(f"HTTP client initialised (pid {os.getpid()}, {'HTTP/2 via httpx' if self.http2 else 'HTTP/1.1 via requests'})")
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 15):
+        if not self.http2:
+            return self._client.get(url, params=params, timeout=timeout)
+
+        for attempt in range(MAX_RETRIES + 1):
+            _stats.record_request()
+            retry_after = None
+            try:
+                response = self._client.get(url, params=params, timeout=timeout, extensions={"trace": _httpx_trace})
+            except httpx.TransportError:
+                if attempt == MAX_RETRIES:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+            time.sleep(retry_delay(attempt + 1, retry_after))
+
+_client: Optional[PooledHttpClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+def get_http_client() -> PooledHttpClient:
+    """Returns this process's shared client, creating a fresh one after a fork."""
+    global _client, _client_pid, _stats
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            # Sockets and counters inherited from the parent must not be shared
+            _stats = PoolStats()
+            _client = PooledHttpClient()
+            _client_pid = os.getpid()
+        return _client
+
+def get_pool_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
@@ -0,0 +1,306 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import redis
+import requests
+
+from .cache import get_redis
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Process-wide gateway for every LLM call. Clients are built once per process
+# and model, and the fleet shares one concurrency cap and one requests-per-minute
+# window in Redis. Rate-limit responses put the whole fleet on a cooldown for as
+# long as the provider's Retry-After asks, instead of every worker retrying blindly.
+INFLIGHT_KEY = "llm:inflight"
+REQUESTS_KEY = "llm:requests"
+COOLDOWN_KEY = "llm:cooldown"
+STATS_KEY = "llm:stats"
+
+# Returns 0 when a slot was taken, otherwise how many ms to wait before asking again
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cooldown = redis.call('PTTL', KEYS[3])
+if cooldown > 0 then return cooldown end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then return 100 end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - 60000)
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+    return math.max(1, tonumber(oldest[2]) + 60000 - now)
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), ARGV[1])
+redis.call('ZADD', KEYS[2], now, ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[2], 60000)
+return 0
+"""
+
+# Starts or extends the cooldown to ARGV[1] ms; never shortens a longer one
+COOLDOWN_SCRIPT = """
+if redis.call('PTTL', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], 1, 'PX', ARGV[1])
+end
+"""
+
+# Also caps the provider's Retry-After, which pauses every worker's LLM calls
+MAX_BACKOFF_SECONDS = 30.0
+
+class LLMError(Exception):
+    pass
+
+class RateLimitedError(LLMError):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# --- Reused clients (rebuilt after a fork, like core.http_client) ---
+_clients: Dict[Tuple[str, float], Any] = {}
+_clients_pid: Optional[int] = None
+_clients_lock = threading.Lock()
+_fake_session: Optional[requests.Session] = None
+_fake_session_pid: Optional[int] = None
+
+def get_llm(model: str, temperature: float):
+    """The shared chat client for (model, temperature) in this process."""
+    global _clients_pid
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        key = (model, temperature)
+        if key not in _clients:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            # One attempt per call: retries and backoff are the gateway's job
+            _clients[key] = ChatGoogleGenerativeAI(model=model, temperature=temperature, max_retries=1)
+        return _clients[key]
+
+def _get_fake_session() -> requests.Session:
+    global _fake_session, _fake_session_pid
+    with _clients_lock:
+        if _fake_session is None or _fake_session_pid != os.getpid():
+            _fake_session = requests.Session()
+            _fake_session_pid = os.getpid()
+        return _fake_session
+
+# --- Stats ---
+def _record_stats(**amounts: float):
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for name, amount in amounts.items():
+            pipe.hincrbyfloat(STATS_KEY, name, amount)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record LLM stats: {e}")
+
+def summarize_llm_stats(raw: Dict) -> Dict[str, Any]:
+    """Decodes the STATS_KEY hash and adds per-call averages."""
+    stats = {
+        (k.decode() if isinstance(k, bytes) else k): round(float(v), 1)
+        for k, v in raw.items()
+    }
+    calls = stats.get("calls", 0)
+    if calls:
+        stats["avg_latency_ms"] = round(stats.get("latency_ms", 0) / calls, 1)
+        stats["avg_wait_ms"] = round(stats.get("wait_ms", 0) / calls, 1)
+        stats["avg_input_tokens"] = round(stats.get("input_tokens", 0) / calls, 1)
+        stats["avg_output_tokens"] = round(stats.get("output_tokens", 0) / calls, 1)
+    if stats.get("streamed_calls"):
+        stats["avg_first_token_ms"] = round(stats.get("first_token_ms", 0) / stats["streamed_calls"], 1)
+    return stats
+
+def get_llm_stats() -> Dict[str, Any]:
+    try:
+        return summarize_llm_stats(get_redis().hgetall(STATS_KEY))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read LLM stats: {e}")
+        return {}
+
+# --- Distributed limiter ---
+_local_slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+
+def _acquire_slot(deadline: float) -> Optional[str]:
+    """
+    Waits for a fleet-wide slot and returns its token. Returns None when Redis
+    is unavailable; the caller then holds a per-process slot instead.
+    """
+    token = uuid.uuid4().hex
+    lease_ms = int(settings.LLM_SLOT_LEASE_SECONDS * 1000)
+    while True:
+        try:
+            wait_ms = int(get_redis().eval(
+                ACQUIRE_SCRIPT, 3, INFLIGHT_KEY, REQUESTS_KEY, COOLDOWN_KEY,
+                token, settings.LLM_MAX_CONCURRENCY, settings.LLM_REQUESTS_PER_MINUTE, lease_ms,
+            ))
+        except redis.RedisError as e:
+            logger.warning(f"LLM limiter unavailable, limiting this process only: {e}")
+            if not _local_slots.acquire(timeout=max(0, deadline - time.monotonic())):
+                raise LLMError("Timed out waiting for an LLM request slot")
+            return None
+        if wait_ms == 0:
+            return token
+        if time.monotonic() + wait_ms / 1000 > deadline:
+            raise LLMError("Timed out waiting for an LLM request slot")
+        # Jitter keeps waiting workers from retrying in lockstep
+        time.sleep(min(wait_ms / 1000, 2.0) * random.uniform(0.8, 1.2))
+
+def _release_slot(token: Optional[str]):
+    if token is None:
+        _local_slots.release()
+        return
+    try:
+        get_redis().zrem(INFLIGHT_KEY, token)
+    except redis.RedisError:
+        pass  # the lease expires on its own
+
+def _start_cooldown(seconds: float):
+    try:
+        get_redis().eval(COOLDOWN_SCRIPT, 1, COOLDOWN_KEY, max(1, int(seconds * 1000)))
+    except redis.RedisError:
+        pass
+
+# --- Providers ---
+def _retry_after_from_error(error: Exception) -> Optional[float]:
+    # google.api_core errors carry the RetryInfo detail in their text
+    match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", str(error))
+    return float(match.group(1)) if match else None
+
+def _is_rate_limit(error: Exception) -> bool:
+    message = str(error)
+    return "ResourceExhausted" in type(error).__name__ or "429" in message or "quota" in message.lower()
+
+def _call_gemini(prompt: str, model: str, temperature: float,
+                 on_text: Optional[Callable[[str], None]] = None) -> Tuple[str, int, int]:
+    llm = get_llm(model, temperature)
+    try:
+        if on_text is None:
+            message = llm.invoke(prompt)
+        else:
+            # Adding the chunks merges their content and usage metadata
+            message = None
+            for chunk in llm.stream(prompt):
+                message = chunk if message is None else message + chunk
+                on_text(message.content)
+            if message is None:
+                raise LLMError("Empty response from the model")
+    except LLMError:
+        raise
+    except Exception as e:
+        if _is_rate_limit(e):
+            raise RateLimitedError(str(e), _retry_after_from_error(e)) from e
+        raise LLMError(str(e)) from e
+    usage = getattr(message, "usage_metadata", None) or {}
+    return message.content, usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+def _call_fake(prompt: str, model: str, temperature: float,
+               on_text: Optional[Callable[[str], None]] = None) -> Tuple[str, int, int]:
+    # Local stand-in server (tools/fake_llm_server.py) for load and limiter tests
+    streaming = on_text is not None
+    try:
+        response = _get_fake_session().post(
+            settings.LLM_FAKE_URL,
+            json={"model": model, "temperature": temperature, "prompt": prompt, "stream": streaming},
+            timeout=settings.LLM_REQUEST_TIMEOUT,
+            stream=streaming,
+        )
+    except requests.RequestException as e:
+        raise LLMError(str(e)) from e
+    with response:
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitedError("429 from fake LLM server", float(retry_after) if retry_after else None)
+        if response.status_code >= 400:
+            raise LLMError(f"Fake LLM server returned {response.status_code}")
+        if not streaming:
+            body = response.json()
+            return body["text"], body.get("input_tokens", 0), body.get("output_tokens", 0)
+
+        # One JSON object per line: {"text": piece} chunks, then the token counts
+        text, usage = "", {}
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if "text" in event:
+                    text += event["text"]
+                    on_text(text)
+                else:
+                    usage = event
+        except requests.RequestException as e:
+            raise LLMError(str(e)) from e
+    return text, usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+def generate(prompt: str, model: Optional[str] = None, temperature: float = 0.3,
+             on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Sends `prompt` through the shared limiter and returns {'text', 'input_tokens',
+    'output_tokens', 'latency_ms'}. Rate-limited calls are retried after the
+    provider's Retry-After, capped at MAX_BACKOFF_SECONDS (or exponential
+    backoff with jitter), up to LLM_MAX_RETRIES times; raises LLMError when
+    out of retries or time.
+
+    With `on_text` the response is streamed, and on_text gets the whole text
+    so far after every chunk. A retry starts the text over.
+    """
+    model = model or settings.LLM_MODEL
+    call = _call_fake if settings.LLM_FAKE_URL else _call_gemini
+    deadline = time.monotonic() + settings.LLM_SLOT_TIMEOUT
+
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        wait_started = time.monotonic()
+        token = _acquire_slot(deadline)
+        wait_ms = 1000 * (time.monotonic() - wait_started)
+        started = time.monotonic()
+        first_token_at = []
+
+        def forward(text: str):
+            if not first_token_at:
+                first_token_at.append(time.monotonic())
+            on_text(text)
+
+        try:
+            text, input_tokens, output_tokens = call(prompt, model, temperature, forward if on_text else None)
+        except RateLimitedError as e:
+            if e.retry_after:
+                backoff = min(e.retry_after, MAX_BACKOFF_SECONDS)
+            else:
+                backoff = min(MAX_BACKOFF_SECONDS, 2 ** attempt) * random.uniform(0.5, 1.5)
+            _record_stats(rate_limited=1, wait_ms=wait_ms)
+            if attempt == settings.LLM_MAX_RETRIES:
+                _record_stats(errors=1)
+                raise
+            logger.warning(f"LLM rate limited (attempt {attempt + 1}), cooling down for {backoff:.1f}s")
+            _record_stats(retries=1)
+            if token is None:
+                time.sleep(backoff)
+            else:
+                # Every worker waits out the cooldown, not just this one
+                _start_cooldown(backoff)
+            continue
+        except LLMError:
+            _record_stats(errors=1, wait_ms=wait_ms)
+            raise
+        finally:
+            _release_slot(token)
+
+        latency_ms = 1000 * (time.monotonic() - started)
+        stats = dict(calls=1, latency_ms=latency_ms, wait_ms=wait_ms,
+                     input_tokens=input_tokens, output_tokens=output_tokens)
+        if first_token_at:
+            stats.update(streamed_calls=1, first_token_ms=1000 * (first_token_at[0] - started))
+        _record_stats(**stats)
+        logger.info(f"LLM call to {model}: {latency_ms:.0f} ms, waited {wait_ms:.0f} ms for a slot, "
+                    f"{input_tokens} input / {output_tokens} output tokens")
+        return {"text": text, "input_tokens": input_tokens, "output_tokens": output_tokens, "latency_ms": round(latency_ms)}
+    raise LLMError("LLM retries exhausted")
@@ -1,13 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, desc, func, cast, Text, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from uuid import UUID
-from typing import List
+from typing import Optional
+from datetime import date, datetime, timedelta
+import numpy as np
+import base64
+import hashlib
+import json
 import models.analysis_job as model
 import schemas
-from core.database import SessionLocal, engine
+from core.config import settings
+from core.database import engine
+from core.async_database import AsyncSessionLocal
+from core.llm_gateway import STATS_KEY as LLM_STATS_KEY, summarize_llm_stats
+from core.events import TERMINAL_STATUSES, job_channel, job_report_key, job_snapshot_key, get_async_redis
 from tasks.main_task import run_full_analysis
+from tasks.batch_task import run_batch_analysis
+from tools.analyst_tools import REPORT_CACHE_STATS_KEY, summarize_report_cache_stats
+from tools.chart_tools import lttb_indices
+from tools.market_data_tools import get_price_range
+from tools.ohlcv_store import period_start
+from tools.prewarm_tools import STATS_KEY as PREWARM_STATS_KEY, summarize_prewarm_stats
 
 model.Base.metadata.create_all(bind=engine)
 
@@ -24,32 +42,350 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def find_reusable_job(db: AsyncSession, ticker: str) -> Optional[model.AnalysisJob]:
+    """
+    An in-flight job for the ticker (recent enough not to be stuck), or else a
+    successful one finished within the freshness window.
+    """
+    now = datetime.utcnow()
+    in_flight = (await db.execute(
+        select(model.AnalysisJob)
+        .where(model.AnalysisJob.ticker == ticker)
+        .where(model.AnalysisJob.status.notin_(TERMINAL_STATUSES))
+        .where(model.AnalysisJob.created_at >= now - timedelta(seconds=settings.JOB_INFLIGHT_MAX_AGE))
+        .order_by(desc(model.AnalysisJob.created_at))
+        .limit(1)
+    )).scalars().first()
+    if in_flight:
+        return in_flight
+
+    if settings.JOB_FRESHNESS_SECONDS <= 0:
+        return None
+    return (await db.execute(
+        select(model.AnalysisJob)
+        .where(model.AnalysisJob.ticker == ticker)
+        .where(model.AnalysisJob.status == "SUCCESS")
+        .where(model.AnalysisJob.created_at >= now - timedelta(seconds=settings.JOB_FRESHNESS_SECONDS))
+        .order_by(desc(model.AnalysisJob.created_at))
+        .limit(1)
+    )).scalars().first()
 
 @app.post("/jobs", response_model=schemas.Job, status_code=201)
-def create_analysis_job(job_request: schemas.JobCreate, db: Session = Depends(get_db)):
-    db_job = model.AnalysisJob(ticker=job_request.ticker.upper())
+async def create_analysis_job(job_request: schemas.JobCreate, response: Response, db: AsyncSession = Depends(get_db)):
+    ticker = job_request.ticker.upper()
+
+    # Serialize job creation per ticker so concurrent requests can't both miss
+    # each other's job; the lock is released when the transaction ends.
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(ticker))))
+
+    if not (job_request.force_refresh or job_request.bypass_llm_cache):
+        existing_job = await find_reusable_job(db, ticker)
+        if existing_job:
+            await db.commit()
+            response.status_code = 200
+            return existing_job
+
+    # stages=[] marks the collection as loaded; the defaults are generated
+    # client-side, so no refresh (and no lazy load on the async session) is needed
+    db_job = model.AnalysisJob(ticker=ticker, stages=[])
     db.add(db_job)
-    db.commit()
-    db.refresh(db_job)
+    await db.commit()
     
-    run_full_analysis.delay(str(db_job.id), db_job.ticker)
+    # Publishing to the broker is a blocking Redis call; keep it off the event loop
+    await run_in_threadpool(run_full_analysis.delay, str(db_job.id), db_job.ticker, job_request.bypass_llm_cache)
     
     return db_job
 
+async def batch_response(db: AsyncSession, batch: model.AnalysisBatch) -> dict:
+    """The batch with every ticker's job status; never reads the job results."""
+    jobs = (await db.execute(
+        select(model.AnalysisJob.id, model.AnalysisJob.ticker, model.AnalysisJob.status, model.AnalysisJob.created_at)
+        .where(model.AnalysisJob.batch_id == batch.id)
+        .order_by(model.AnalysisJob.ticker)
+    )).all()
+    elapsed = None
+    if batch.started_at:
+        elapsed = ((batch.completed_at or datetime.utcnow()) - batch.started_at).total_seconds()
+    return {
+        "id": batch.id,
+        "status": batch.status,
+        "created_at": batch.created_at,
+        "started_at": batch.started_at,
+        "completed_at": batch.completed_at,
+        "elapsed_seconds": elapsed,
+        "total": len(jobs),
+        "completed": sum(job.status in TERMINAL_STATUSES for job in jobs),
+        "failed": sum(job.status == "FAILED" for job in jobs),
+        "jobs": jobs,
+    }
+
+@app.post("/batches", response_model=schemas.Batch, status_code=201)
+async def create_batch(batch_request: schemas.BatchCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Analyzes a watchlist in one worker task that shares the history download,
+    sentiment scoring and LLM concurrency across tickers. Every ticker gets its
+    own job, pollable through GET /jobs/{id} as usual.
+    """
+    # Uppercased and de-duplicated, keeping the caller's order
+    tickers = list(dict.fromkeys(t.strip().upper() for t in batch_request.tickers if t.strip()))
+    if not tickers:
+        raise HTTPException(status_code=400, detail="At least one ticker is required")
+    if len(tickers) > settings.BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {settings.BATCH_MAX_TICKERS} tickers")
+
+    db_batch = model.AnalysisBatch(tickers=tickers)
+    db.add(db_batch)
+    await db.flush()
+    db.add_all([model.AnalysisJob(ticker=ticker, batch_id=db_batch.id, stages=[]) for ticker in tickers])
+    await db.commit()
+
+    await run_in_threadpool(run_batch_analysis.delay, str(db_batch.id))
+
+    return await batch_response(db, db_batch)
+
+@app.get("/batches/{batch_id}", response_model=schemas.Batch)
+async def get_batch(batch_id: UUID, db: AsyncSession = Depends(get_db)):
+    db_batch = await db.get(model.AnalysisBatch, batch_id)
+    if db_batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return await batch_response(db, db_batch)
+
+def job_etag(job_id: UUID, status: str, result_digest: Optional[str]) -> str:
+    return '"' + hashlib.md5(f"{job_id}:{status}:{result_digest}".encode()).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(","))
+
 @app.get("/jobs/{job_id}", response_model=schemas.Job)
-def get_job_status(job_id: UUID, db: Session = Depends(get_db)):
-    db_job = db.query(model.AnalysisJob).filter(model.AnalysisJob.id == job_id).first()
+async def get_job_status(job_id: UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    # The ETag is derived from an md5 of the result computed inside Postgres,
+    # so an unchanged job is answered with 304 without shipping the JSON blob.
+    stage = model.AnalysisJobStage
+    stages_digest = (
+        select(func.md5(func.array_to_string(
+            func.array_agg(aggregate_order_by(stage.stage + ":" + cast(stage.data, Text), stage.stage)), "|"
+        )))
+        .where(stage.job_id == model.AnalysisJob.id)
+        .scalar_subquery()
+    )
+    row = (await db.execute(
+        select(model.AnalysisJob.status, func.md5(
+            func.coalesce(cast(model.AnalysisJob.legacy_result, Text), "") + func.coalesce(stages_digest, "")
+        ))
+        .where(model.AnalysisJob.id == job_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    etag = job_etag(job_id, row[0], row[1])
+    # no-cache makes browsers revalidate every poll with If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    db_job = await db.get(model.AnalysisJob, job_id)
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job not found")
+    response.headers.update(headers)
     return db_job
 
-@app.get("/jobs", response_model=List[schemas.Job])
-def get_jobs_history(db: Session = Depends(get_db)):
-    db_jobs = db.query(model.AnalysisJob).order_by(desc(model.AnalysisJob.created_at)).limit(20).all()
-    return db_jobs
\ No newline at end of file
+@app.get("/jobs/{job_id}/status", response_model=schemas.JobStatus)
+async def get_job_status_only(job_id: UUID, db: AsyncSession = Depends(get_db)):
+    """Status-only projection for cheap polling; never reads the result column."""
+    row = (await db.execute(
+        select(model.AnalysisJob.id, model.AnalysisJob.ticker, model.AnalysisJob.status, model.AnalysisJob.created_at)
+        .where(model.AnalysisJob.id == job_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return row
+
+def encode_cursor(created_at: datetime, job_id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{job_id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/jobs", response_model=schemas.JobPage)
+async def get_jobs_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    ticker: Optional[str] = None,
+    status: Optional[str] = Query(None, description="One status or a comma-separated list"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Newest-first job summaries (no result blob), paginated by keyset on
+    (created_at, id). Pass the returned next_cursor to get the following page.
+    """
+    query = select(
+        model.AnalysisJob.id, model.AnalysisJob.ticker, model.AnalysisJob.status, model.AnalysisJob.created_at
+    )
+    if ticker:
+        query = query.where(model.AnalysisJob.ticker == ticker.upper())
+    if status:
+        query = query.where(model.AnalysisJob.status.in_([s.strip().upper() for s in status.split(",")]))
+    if cursor:
+        query = query.where(tuple_(model.AnalysisJob.created_at, model.AnalysisJob.id) < tuple_(*decode_cursor(cursor)))
+
+    rows = (await db.execute(
+        query.order_by(desc(model.AnalysisJob.created_at), desc(model.AnalysisJob.id)).limit(limit + 1)
+    )).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return {"items": rows, "next_cursor": next_cursor}
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: UUID, request: Request):
+    """
+    Server-Sent Events stream of the job's state. Sends the current state
+    first, then every update the worker publishes, and closes after SUCCESS
+    or FAILED. Reads the database at most once, when Redis has no snapshot.
+
+    While the report is generated, "report" events carry {"offset", "delta"}:
+    the report text is text[:offset] + delta. The first one, sent on connect,
+    holds everything generated so far.
+    """
+    redis_client = get_async_redis()
+    pubsub = redis_client.pubsub()
+    # Subscribe before reading the snapshot so no update can slip in between
+    await pubsub.subscribe(job_channel(job_id))
+
+    snapshot = await redis_client.get(job_snapshot_key(job_id))
+    if snapshot is None:
+        async with AsyncSessionLocal() as db:
+            db_job = await db.get(model.AnalysisJob, job_id)
+        if db_job is None:
+            await pubsub.aclose()
+            raise HTTPException(status_code=404, detail="Job not found")
+        snapshot = schemas.Job.model_validate(db_job).model_dump_json()
+    elif isinstance(snapshot, bytes):
+        snapshot = snapshot.decode()
+    report = await redis_client.get(job_report_key(job_id))
+
+    async def event_stream():
+        try:
+            yield f"data: {snapshot}\n\n"
+            if json.loads(snapshot)["status"] in TERMINAL_STATUSES:
+                return
+            if report:
+                yield f"event: report\ndata: {json.dumps({'offset': 0, 'delta': report.decode()})}\n\n"
+            while not await request.is_disconnected():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=15.0)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                data = message["data"].decode()
+                event = json.loads(data)
+                if event.get("event") == "report":
+                    yield f"event: report\ndata: {data}\n\n"
+                    continue
+                yield f"data: {data}\n\n"
+                if event["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/jobs/{job_id}/report", response_model=schemas.ReportProgress)
+async def get_job_report(job_id: UUID, offset: int = Query(0, ge=0), db: AsyncSession = Depends(get_db)):
+    """
+    The analyst report from `offset` on, for clients that poll instead of
+    streaming. Reads the text being generated from Redis, falling back to the
+    last copy the worker saved.
+    """
+    row = (await db.execute(
+        select(model.AnalysisJob.status).where(model.AnalysisJob.id == job_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    text = await get_async_redis().get(job_report_key(job_id))
+    if text is not None:
+        text = text.decode()
+    else:
+        stage = await db.get(model.AnalysisJobStage, (job_id, "llm_analysis"))
+        text = (stage.data or {}).get("llm_report", "") if stage else ""
+    return {
+        "id": job_id,
+        "status": row.status,
+        "offset": min(offset, len(text)),
+        "text": text[offset:],
+        "length": len(text),
+        "complete": row.status in TERMINAL_STATUSES,
+    }
+
+@app.get("/tickers/{ticker}/history", response_model=schemas.PriceHistory)
+async def get_ticker_history(
+    ticker: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    period: str = "1y",
+    points: int = Query(500, ge=10, le=5000),
+):
+    """
+    Daily OHLCV as parallel arrays, downsampled server-side with LTTB on the
+    close to at most `points` points. `start`/`end` take precedence over `period`.
+    """
+    symbol = ticker.upper()
+    if not symbol.endswith(('.NS', '.BO')):
+        symbol = f"{symbol}.NS"
+    try:
+        range_start = np.datetime64(start, 'D') if start else period_start(period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    range_end = np.datetime64(end, 'D') if end else None
+
+    # The data layer is blocking (file store + yfinance on a miss)
+    bars = await run_in_threadpool(get_price_range, symbol, range_start, range_end)
+    bars = bars[~np.isnan(bars['close'])]
+    if len(bars) == 0:
+        raise HTTPException(status_code=404, detail=f"No price history for {symbol}")
+
+    sampled = bars[lttb_indices(bars['date'].astype('int64'), bars['close'], points)]
+    return {
+        "ticker": symbol,
+        "source_points": len(bars),
+        "points": len(sampled),
+        "date": sampled['date'].astype(str).tolist(),
+        "open": np.round(sampled['open'], 2).tolist(),
+        "high": np.round(sampled['high'], 2).tolist(),
+        "low": np.round(sampled['low'], 2).tolist(),
+        "close": np.round(sampled['close'], 2).tolist(),
+        "volume": np.nan_to_num(sampled['volume']).astype('int64').tolist(),
+    }
+
+@app.get("/metrics/prewarm")
+async def get_prewarm_metrics():
+    """How many jobs started with warm caches, and how the latest prewarm run went."""
+    return summarize_prewarm_stats(await get_async_redis().hgetall(PREWARM_STATS_KEY))
+
+@app.get("/metrics/llm")
+async def get_llm_metrics():
+    """Fleet-wide LLM call counts, latency, slot wait, retries and token usage."""
+    return summarize_llm_stats(await get_async_redis().hgetall(LLM_STATS_KEY))
+
+@app.get("/metrics/llm-cache")
+async def get_llm_cache_metrics():
+    """Analyst report cache hits (exact and near-duplicate), misses and bypasses."""
+    return summarize_report_cache_stats(await get_async_redis().hgetall(REPORT_CACHE_STATS_KEY))
@@ -1,8 +1,14 @@
-from sqlalchemy import Column, String, JSON, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, JSON, DateTime, Index, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
 import uuid
 from core.database import Base
 from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Stages merged into the top level of the assembled result; every other stage
+# is nested under its own key (e.g. result["intelligence_briefing"]).
+TOP_LEVEL_STAGES = ("fundamentals", "error")
 
 class AnalysisJob(Base):
     __tablename__ = "analysis_jobs"
@@ -10,5 +16,63 @@ class AnalysisJob(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     ticker = Column(String, nullable=False, index=True)
     status = Column(String, default="PENDING", nullable=False)
-    result = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False) 
\ No newline at end of file
+    # Whole-result blob written by jobs that predate analysis_job_stages
+    legacy_result = Column("result", JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Set for jobs created as part of a watchlist batch (POST /batches)
+    batch_id = Column(UUID(as_uuid=True), ForeignKey("analysis_batches.id", ondelete="SET NULL"), nullable=True, index=True)
+
+    stages = relationship(
+        "AnalysisJobStage",
+        lazy="selectin",
+        cascade="all, delete-orphan",
+        order_by="AnalysisJobStage.stage",
+    )
+
+    # Keyset pagination of the job history (see GET /jobs)
+    __table_args__ = (
+        Index("ix_analysis_jobs_created_at_id", "created_at", "id"),
+        Index("ix_analysis_jobs_ticker_created_at_id", "ticker", "created_at", "id"),
+        Index("ix_analysis_jobs_status_created_at_id", "status", "created_at", "id"),
+    )
+
+    def set_stage(self, stage: str, data: Any):
+        """Stores one stage's output; only that stage's row is written on commit."""
+        for row in self.stages:
+            if row.stage == stage:
+                row.data = data
+                return
+        self.stages.append(AnalysisJobStage(stage=stage, data=data))
+
+    @property
+    def result(self) -> Optional[Dict[str, Any]]:
+        """The full result, assembled from the per-stage rows."""
+        if not self.stages:
+            return self.legacy_result
+        result = dict(self.legacy_result or {})
+        by_stage = {row.stage: row.data for row in self.stages}
+        result.update(by_stage.get("fundamentals") or {})
+        for stage, data in by_stage.items():
+            if stage not in TOP_LEVEL_STAGES:
+                result[stage] = data
+        result.update(by_stage.get("error") or {})
+        return result
+
+class AnalysisJobStage(Base):
+    __tablename__ = "analysis_job_stages"
+
+    job_id = Column(UUID(as_uuid=True), ForeignKey("analysis_jobs.id", ondelete="CASCADE"), primary_key=True)
+    stage = Column(String, primary_key=True)
+    data = Column(JSONB, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+class AnalysisBatch(Base):
+    """A watchlist run: one AnalysisJob per ticker, processed by one task."""
+    __tablename__ = "analysis_batches"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    status = Column(String, default="PENDING", nullable=False)
+    tickers = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from uuid import UUID
+from datetime import datetime
 from typing import Optional, Dict, Any, List
 
 # --- Schemas for Intelligence Briefing ---
@@ -25,6 +26,8 @@ class IntelligenceBriefing(BaseModel):
 class LLMReport(BaseModel):
     llm_report: str
     error: Optional[str] = None
+    # True while the report is still being generated (llm_report is partial)
+    streaming: bool = False
 
 # --- Main Schema for the 'result' field ---
 class JobResult(BaseModel):
@@ -54,6 +57,10 @@ class JobResult(BaseModel):
 # --- Main Job Schemas for API endpoints ---
 class JobCreate(BaseModel):
     ticker: str
+    # Skip reuse of in-flight or recent jobs for this ticker
+    force_refresh: bool = False
+    # Generate a new LLM report even if one for identical inputs is cached
+    bypass_llm_cache: bool = False
 
 class Job(BaseModel):
     id: UUID
@@ -61,4 +68,54 @@ class Job(BaseModel):
     status: str
     result: Optional[JobResult] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class JobStatus(BaseModel):
+    id: UUID
+    ticker: str
+    status: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class JobPage(BaseModel):
+    items: List[JobStatus]
+    next_cursor: Optional[str] = None
+
+# --- Batch (watchlist) jobs ---
+# The analyst report as generated so far (GET /jobs/{id}/report)
+class ReportProgress(BaseModel):
+    id: UUID
+    status: str
+    offset: int
+    text: str
+    length: int
+    complete: bool
+
+class BatchCreate(BaseModel):
+    tickers: List[str]
+
+class Batch(BaseModel):
+    id: UUID
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    # Wall-clock time of the whole batch so far (or in total, once completed)
+    elapsed_seconds: Optional[float] = None
+    total: int
+    completed: int
+    failed: int
+    jobs: List[JobStatus]
+
+# --- Price history for charts (parallel arrays, one entry per point) ---
+class PriceHistory(BaseModel):
+    ticker: str
+    source_points: int
+    points: int
+    date: List[str]
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+    volume: List[int]
@@ -22,9 +22,7 @@ def run_advisor_analysis(job_id: str):
         
         advisor_summary = generate_investment_thesis(current_data)
         
-        new_result = current_data.copy()
-        new_result['advisor_summary'] = advisor_summary
-        job.result = new_result
+        job.set_stage('advisor_summary', advisor_summary)
         
         job.status = "SUCCESS" # This is the final successful step
         db.commit()
@@ -36,9 +34,7 @@ def run_advisor_analysis(job_id: str):
         print(f"Error during advisor analysis for job {job_id}: {e}")
         if job:
             job.status = "FAILED"
-            error_data = job.result if job.result else {}
-            error_data['error'] = f"Advisor analysis failed: {str(e)}"
-            job.result = error_data
+            job.set_stage('error', {'error': f"Advisor analysis failed: {str(e)}"})
             db.commit()
         final_result = f"Error: {e}"
     finally:
@@ -0,0 +1,157 @@
+from celery_worker import celery
+from core.config import settings
+from core.database import SessionLocal
+from core.events import TERMINAL_STATUSES, serialize_job, publish_job_update
+from models.analysis_job import AnalysisBatch, AnalysisJob
+from tools.data_tools import get_stock_data
+from tools.market_data_tools import prefetch_price_history, yahoo_symbol
+from tools.news_tools import collect_news, headline_titles, build_intelligence_briefing
+from tools.sentiment_tools import classify_titles
+from tools.analyst_tools import HISTORY_PERIOD, get_llm_analysis, get_historical_data_text
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from uuid import UUID
+
+@celery.task
+def run_batch_analysis(batch_id: str):
+    """
+    Runs the analysis pipeline for every ticker of a batch, sharing the work
+    that amortizes: one multi-ticker history download, one sentiment pass over
+    all headlines, and LLM calls with bounded concurrency. Each ticker keeps its
+    own AnalysisJob, so per-ticker progress is visible like any other job.
+    """
+    print(f"\n--- [START] Batch analysis {batch_id} ---")
+
+    db = SessionLocal()
+    batch = db.query(AnalysisBatch).filter(AnalysisBatch.id == UUID(batch_id)).first()
+
+    if not batch:
+        print(f"Batch {batch_id} not found. Aborting.")
+        db.close()
+        return
+
+    jobs = db.query(AnalysisJob).filter(AnalysisJob.batch_id == batch.id).all()
+
+    def save_and_publish(*changed_jobs):
+        # Same contract as run_full_analysis: serialize, commit, then publish
+        payloads = [(job.id, serialize_job(job)) for job in changed_jobs]
+        db.commit()
+        for job_id, payload in payloads:
+            publish_job_update(job_id, payload)
+
+    def fail(job, error_message: str):
+        print(f"!!! [FAILURE] {job.ticker} in batch {batch_id}: {error_message}")
+        job.status = "FAILED"
+        job.set_stage("error", {"error": f"Analysis failed for ticker '{job.ticker}'. This stock may not be listed or there was a problem fetching its data. Please check the ticker symbol and try again. (Details: {error_message})"})
+        save_and_publish(job)
+
+    # Worker threads only do network I/O and return plain dicts; this thread
+    # owns the DB session and every status update.
+    executor = ThreadPoolExecutor(max_workers=settings.BATCH_FETCH_CONCURRENCY, thread_name_prefix=f"batch-{batch_id[:8]}")
+    llm_executor = ThreadPoolExecutor(max_workers=settings.BATCH_LLM_CONCURRENCY, thread_name_prefix=f"batch-llm-{batch_id[:8]}")
+
+    try:
+        batch.status = "RUNNING"
+        batch.started_at = datetime.utcnow()
+        for job in jobs:
+            job.status = "DATA_FETCHING"
+        save_and_publish(*jobs)
+
+        # --- Stage 1: Data Fetching ---
+        # Multi-ticker downloads for the whole watchlist seed the OHLCV store, so the
+        # per-ticker history reads below are local.
+        try:
+            counts = prefetch_price_history(sorted({yahoo_symbol(job.ticker) for job in jobs}), periods=(HISTORY_PERIOD,))
+            print(f"Prefetched history for {len(counts)} tickers, {sum(counts.values())} bars")
+        except Exception as e:
+            print(f"Batch history prefetch failed, tickers will download individually: {e}")
+
+        history_futures = {job.id: executor.submit(get_historical_data_text, job.ticker) for job in jobs}
+        data_futures = {executor.submit(get_stock_data, job.ticker): job for job in jobs}
+
+        # News collection for a ticker starts as soon as its fundamentals land
+        company_names, news_futures = {}, {}
+        for future in as_completed(data_futures):
+            job = data_futures[future]
+            try:
+                data_result = future.result()
+            except Exception as e:
+                data_result = {"error": str(e)}
+            if "error" in data_result:
+                fail(job, f"Data fetching failed: {data_result['error']}")
+                continue
+
+            company_names[job.id] = data_result.get("company_name", job.ticker)
+            job.set_stage("fundamentals", data_result)
+            job.status = "INTELLIGENCE_GATHERING"
+            save_and_publish(job)
+            news_futures[executor.submit(collect_news, job.ticker, company_names[job.id])] = job
+
+        # --- Stage 2: Intelligence Gathering ---
+        news = {}
+        for future in as_completed(news_futures):
+            job = news_futures[future]
+            try:
+                news[job.id] = future.result()
+            except Exception as e:
+                print(f"News collection failed for {job.ticker}: {e}")
+                news[job.id] = []
+
+        # Every headline of the batch goes through the model in one call, so
+        # it runs in full-size batches instead of one small batch per ticker.
+        active = [job for job in jobs if job.id in news]
+        titles = {job.id: headline_titles(news[job.id]) for job in active}
+        try:
+            scores = classify_titles([title for job in active for title in titles[job.id]])
+        except Exception as e:
+            print(f"Batch sentiment scoring failed, falling back to per-ticker scoring: {e}")
+            scores = None
+
+        briefings, offset = {}, 0
+        for job in active:
+            count = len(titles[job.id])
+            results = scores[offset:offset + count] if scores is not None else None
+            offset += count
+            briefings[job.id] = build_intelligence_briefing(news[job.id], results)
+            job.set_stage("intelligence_briefing", briefings[job.id])
+            job.status = "ANALYZING"
+        save_and_publish(*active)
+
+        # --- Stage 3: LLM Analysis ---
+        llm_futures = {
+            llm_executor.submit(get_llm_analysis, job.ticker, company_names[job.id], briefings[job.id],
+                                historical_data=history_futures[job.id].result()): job
+            for job in active
+        }
+        for future in as_completed(llm_futures):
+            job = llm_futures[future]
+            try:
+                llm_result = future.result()
+            except Exception as e:
+                llm_result = {"error": str(e)}
+            if "error" in llm_result:
+                fail(job, f"LLM analysis failed: {llm_result['error']}")
+                continue
+
+            job.set_stage("llm_analysis", llm_result)
+            job.status = "SUCCESS"
+            save_and_publish(job)
+
+        batch.status = "SUCCESS"
+
+    except Exception as e:
+        print(f"!!! [FAILURE] Batch analysis {batch_id} FAILED: {e}")
+        db.rollback()
+        batch.status = "FAILED"
+        for job in jobs:
+            if job.status not in TERMINAL_STATUSES:
+                fail(job, str(e))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        llm_executor.shutdown(wait=False, cancel_futures=True)
+        batch.completed_at = datetime.utcnow()
+        db.commit()
+        succeeded = sum(job.status == "SUCCESS" for job in jobs)
+        elapsed = (batch.completed_at - (batch.started_at or batch.created_at)).total_seconds()
+        print(f"--- [{batch.status}] Batch {batch_id}: {succeeded}/{len(jobs)} tickers succeeded in {elapsed:.1f}s ---")
+        db.close()
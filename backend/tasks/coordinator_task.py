@@ -21,18 +21,14 @@ def coordinator_task(self, results, job_id: str):
             # results[1] is from get_intelligence_task
             # results[2] is from get_llm_analysis_task
             
-            final_result = {
-                **results[0], # Unpack the dictionary from the data task
-                "intelligence_briefing": results[1],
-                "llm_analysis": results[2],
-            }
-
-            job.result = final_result
+            job.set_stage("fundamentals", results[0])
+            job.set_stage("intelligence_briefing", results[1])
+            job.set_stage("llm_analysis", results[2])
             job.status = "SUCCESS"
             db.commit()
             print(f"Coordinator task for job {job_id} successfully saved final result.")
         except Exception as e:
             print(f"Error in coordinator for job {job_id}: {e}")
             job.status = "FAILED"
-            job.result = {"error": f"Final assembly failed: {str(e)}"}
+            job.set_stage("error", {"error": f"Final assembly failed: {str(e)}"})
             db.commit()
\ No newline at end of file
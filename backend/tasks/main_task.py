@@ -1,14 +1,18 @@
 from celery_worker import celery
+from core.config import settings
 from core.database import SessionLocal
+from core.events import ReportStream, serialize_job, publish_job_update
 from models.analysis_job import AnalysisJob
 from tools.data_tools import get_stock_data
 from tools.news_tools import get_combined_news_and_sentiment
-from tools.analyst_tools import get_llm_analysis
+from tools.analyst_tools import get_llm_analysis, get_historical_data_text
+from tools.prewarm_tools import record_job_warmth
+from concurrent.futures import ThreadPoolExecutor
 from uuid import UUID
 import json
 
 @celery.task
-def run_full_analysis(job_id: str, ticker: str):
+def run_full_analysis(job_id: str, ticker: str, bypass_llm_cache: bool = False):
     """
     The single, main task that orchestrates the entire analysis pipeline.
     """
@@ -22,56 +26,80 @@ def run_full_analysis(job_id: str, ticker: str):
         db.close()
         return
 
+    def save_and_publish():
+        # Every state change is pushed to streaming clients (GET /jobs/{id}/events).
+        # Serialize before committing, while the attributes are still loaded.
+        payload = serialize_job(job)
+        db.commit()
+        publish_job_update(job.id, payload)
+
+    # The stage functions only do network I/O and return plain dicts, so they can
+    # run on pool threads while this thread owns the DB session and the status
+    # updates. In sequential mode the single worker runs them one by one.
+    max_workers = 3 if settings.PIPELINE_MODE == "parallel" else 1
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"job-{job_id[:8]}")
+
     try:
+        # Counted before any stage runs, while the caches are as the job found them
+        warm = record_job_warmth(ticker)
+
         # --- Stage 1: Data Fetching ---
-        print(f"Stage 1: DATA_FETCHING for job {job_id}")
+        print(f"Stage 1: DATA_FETCHING for job {job_id} (pipeline mode: {settings.PIPELINE_MODE}, cache {'warm' if warm else 'cold'})")
         job.status = "DATA_FETCHING"
-        db.commit()
-        
-        data_result = get_stock_data(ticker)
+        save_and_publish()
+
+        data_future = executor.submit(get_stock_data, ticker)
+        # The LLM's price history only needs the ticker, so it downloads
+        # while fundamentals and news are being gathered.
+        history_future = executor.submit(get_historical_data_text, ticker)
+
+        data_result = data_future.result()
         if "error" in data_result:
             raise ValueError(f"Data fetching failed: {data_result['error']}")
         
         company_name = data_result.get("company_name", ticker)
         
-        job.result = data_result
-        db.commit()
+        job.set_stage("fundamentals", data_result)
+        save_and_publish()
         print("-> Data fetching stage complete.")
 
         # --- Stage 2: Intelligence Gathering ---
         print(f"Stage 2: INTELLIGENCE_GATHERING for job {job_id}")
         job.status = "INTELLIGENCE_GATHERING"
-        db.commit()
+        save_and_publish()
         
-        intelligence_result = get_combined_news_and_sentiment(ticker, company_name)
+        intelligence_result = executor.submit(get_combined_news_and_sentiment, ticker, company_name).result()
         
-        current_result = dict(job.result)
-        current_result['intelligence_briefing'] = intelligence_result
-        job.result = current_result
-        db.commit()
+        job.set_stage("intelligence_briefing", intelligence_result)
+        save_and_publish()
         print("-> Intelligence gathering stage complete.")
         
         # --- Stage 3: LLM Analysis ---
         print(f"Stage 3: ANALYZING for job {job_id}")
         job.status = "ANALYZING"
-        db.commit()
+        save_and_publish()
 
-        # We need to refresh the job object to get the latest result for the LLM
-        db.refresh(job)
-        data_for_llm = job.result
-        
-        llm_result = get_llm_analysis(ticker, company_name, data_for_llm.get("intelligence_briefing", {}))
+        def save_partial_report(text: str):
+            job.set_stage("llm_analysis", {"llm_report": text, "streaming": True})
+            save_and_publish()
+
+        # The report streams to Redis as it is generated and reaches the
+        # database in coarse chunks; the final save below replaces it.
+        report_stream = ReportStream(job.id, save_partial_report) if settings.LLM_STREAM_ENABLED else None
+
+        # Only the LLM call waits on its inputs; the history is usually ready by now.
+        llm_result = get_llm_analysis(ticker, company_name, intelligence_result,
+                                      historical_data=history_future.result(),
+                                      use_cache=not bypass_llm_cache,
+                                      on_text=report_stream)
         if "error" in llm_result:
             raise ValueError(f"LLM analysis failed: {llm_result['error']}")
         
         # --- Final Assembly and Save ---
-        print("Finalizing results for job {job_id}")
-        final_result_data = dict(job.result)
-        final_result_data['llm_analysis'] = llm_result
-        
-        job.result = final_result_data
+        print(f"Finalizing results for job {job_id}")
+        job.set_stage("llm_analysis", llm_result)
         job.status = "SUCCESS"
-        db.commit()
+        save_and_publish()
         
         print(f"--- [SUCCESS] Full analysis for {job_id} complete. ---")
 
@@ -83,9 +111,8 @@ def run_full_analysis(job_id: str, ticker: str):
             # Provide a cleaner error message for the user, while keeping technical details
             user_friendly_error = f"Analysis failed for ticker '{ticker}'. This stock may not be listed or there was a problem fetching its data. Please check the ticker symbol and try again. (Details: {error_message})"
             
-            error_data = job.result if job.result else {}
-            error_data['error'] = user_friendly_error
-            job.result = error_data
-            db.commit()
+            job.set_stage("error", {"error": user_friendly_error})
+            save_and_publish()
     finally:
+        executor.shutdown(wait=False, cancel_futures=True)
         db.close()
\ No newline at end of file
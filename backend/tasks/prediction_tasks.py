@@ -2,10 +2,11 @@ from celery_worker import celery
 from core.database import SessionLocal
 from models.analysis_job import AnalysisJob
 from tools.prediction_tools import generate_forecast
+from typing import Optional
 from uuid import UUID
 
 @celery.task
-def run_prediction_analysis(job_id: str):
+def run_prediction_analysis(job_id: str, engine: Optional[str] = None):
     db = SessionLocal()
     job = None
     final_result = ""
@@ -23,15 +24,13 @@ def run_prediction_analysis(job_id: str):
         if not ticker:
             raise ValueError("Ticker not found in initial data.")
         
-        forecast_data = generate_forecast(ticker)
+        # engine: "prophet" or "numpy"; None uses settings.FORECAST_ENGINE
+        forecast_data = generate_forecast(ticker, engine)
         
         if "error" in forecast_data:
             raise ValueError(forecast_data["error"])
 
-        new_result = current_data.copy()
-        new_result['prediction_analysis'] = forecast_data
-        job.result = new_result
-        
+        job.set_stage('prediction_analysis', forecast_data)
         db.commit()
         
         print(f"Prediction analysis for job {job_id} completed successfully.")
@@ -41,9 +40,7 @@ def run_prediction_analysis(job_id: str):
         print(f"Error during prediction analysis for job {job_id}: {e}")
         if job:
             job.status = "FAILED"
-            error_data = job.result if job.result else {}
-            error_data['error'] = f"Prediction analysis failed: {str(e)}"
-            job.result = error_data
+            job.set_stage('error', {'error': f"Prediction analysis failed: {str(e)}"})
             db.commit()
         final_result = f"Error: {e}"
     finally:
@@ -0,0 +1,82 @@
+from celery_worker import celery
+from core.cache import get_redis
+from core.config import settings
+from tools.analyst_tools import HISTORY_PERIOD
+from tools.market_data_tools import get_ticker_info, is_market_live, prefetch_price_history, yahoo_symbol
+from tools.news_tools import collect_news, headline_titles, is_rate_limit_error, rate_limited_count
+from tools.sentiment_tools import classify_titles
+from tools.prewarm_tools import record_prewarm_run
+from datetime import datetime
+import time
+import uuid
+
+PREWARM_LOCK_KEY = "prewarm:lock"
+
+@celery.task
+def prewarm_universe(only_when_live: bool = False):
+    """
+    Refreshes the caches a job reads for every ticker in PREWARM_TICKERS:
+    daily bars (multi-ticker downloads of only the bars each ticker's store is
+    missing), fundamentals, news, and headline sentiment. Tickers are paced
+    one at a time so the warm-up never competes with user jobs for the
+    sources' rate limits.
+    """
+    tickers = settings.PREWARM_TICKERS
+    if not tickers or (only_when_live and not is_market_live()):
+        return
+
+    # A slow run must not overlap the next scheduled one
+    token = uuid.uuid4().hex
+    if not get_redis().set(PREWARM_LOCK_KEY, token, nx=True, ex=settings.PREWARM_INTERVAL_MINUTES * 60):
+        print("Prewarm already running, skipping this run.")
+        return
+
+    print(f"\n--- [START] Prewarming caches for {len(tickers)} tickers ---")
+    started_at, started = datetime.utcnow(), time.monotonic()
+    failed, rate_limited, titles = 0, 0, []
+    pacing = settings.PREWARM_PACING_SECONDS
+
+    try:
+        try:
+            prefetch_price_history([yahoo_symbol(t) for t in tickers], periods=(HISTORY_PERIOD,))
+        except Exception as e:
+            print(f"History prefetch failed: {e}")
+
+        for i, ticker in enumerate(tickers):
+            if i:
+                time.sleep(pacing)
+            # The news scrapers swallow their own 429s but count them
+            limited_before = rate_limited_count()
+            try:
+                info = get_ticker_info(yahoo_symbol(ticker))
+                company_name = info.get('longName') or ticker
+                titles.extend(headline_titles(collect_news(ticker, company_name, refresh=True)))
+                limited = rate_limited_count() > limited_before
+                if not limited:
+                    pacing = max(settings.PREWARM_PACING_SECONDS, pacing / 2)
+            except Exception as e:
+                failed += 1
+                limited = is_rate_limit_error(e)
+                if not limited:
+                    print(f"Prewarming {ticker} failed: {e}")
+            if limited:
+                rate_limited += 1
+                pacing = min(pacing * 2, settings.PREWARM_MAX_BACKOFF_SECONDS)
+                print(f"Rate limited while prewarming {ticker}, pacing now {pacing:.0f}s")
+
+        # One model pass fills the sentiment cache for every ticker's headlines
+        if titles:
+            classify_titles(titles)
+    finally:
+        if get_redis().get(PREWARM_LOCK_KEY) == token.encode():
+            get_redis().delete(PREWARM_LOCK_KEY)
+        elapsed = time.monotonic() - started
+        record_prewarm_run({
+            "started_at": started_at.isoformat(),
+            "seconds": round(elapsed, 1),
+            "tickers": len(tickers),
+            "failed": failed,
+            "rate_limited": rate_limited,
+            "headlines": len(titles),
+        })
+        print(f"--- [DONE] Prewarmed {len(tickers) - failed}/{len(tickers)} tickers in {elapsed:.1f}s ---")
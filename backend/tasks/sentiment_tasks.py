@@ -0,0 +1,13 @@
+from celery_worker import celery
+from tools.sentiment_tools import classify_locally, loaded_model_id
+from typing import Any, Dict, List
+
+@celery.task
+def classify_titles_task(titles: List[str]) -> Dict[str, Any]:
+    """
+    Sentiment inference for io workers, run on the sentiment queue next to the
+    loaded model and its batcher. Returns the scores and the id of the model
+    that produced them, so callers only cache scores from the model they expect.
+    """
+    results = classify_locally(titles)
+    return {"model_id": loaded_model_id(), "results": results}
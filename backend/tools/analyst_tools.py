@@ -1,18 +1,174 @@
-import yfinance as yf
-import pandas as pd
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from typing import Dict, Any
+from core.cache import TieredCache, get_redis
+from core.config import settings
+from core.llm_gateway import generate
+from tools.market_data_tools import get_ticker_info, get_price_bars, market_ttl
+from tools.price_features import compute_features, format_features
+from typing import Callable, Dict, Any, List, Mapping, Optional, Tuple
+import hashlib
+import logging
+import numpy as np
+import redis
 import time
 
-def get_llm_analysis(ticker: str, company_name: str, intelligence_briefing: Dict[str, Any]) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+# Built once and shared by every call; only the rendered text differs per job
+ANALYST_PROMPT = PromptTemplate(
+    input_variables=["ticker", "company_name", "historical_data", "news_summary"],
+    template="""
+    You are a Senior Financial Analyst for an Indian market-focused investment fund.
+    Your task is to provide a comprehensive analysis and a 30-day forecast for the stock: {ticker} ({company_name}).
+    
+    **Important Instructions:**
+    - If historical data is limited or unavailable, focus your analysis on news sentiment and general market conditions
+    - Always provide a forecast range even with limited data, but adjust confidence accordingly
+    - Base your analysis ONLY on the provided data
+
+    **Data Provided:**
+
+    1.  **Historical Price Data:**
+        ```
+        {historical_data}
+        ```
+
+    2.  **Recent News & Social Media Headlines:**
+        {news_summary}
+
+    **Your Analysis Report (in Markdown format):**
+
+    ## 30-Day Price Forecast
+
+    **Analysis:** Analyze available data (price trends if available, news sentiment, market conditions). If price data is limited, focus on sentiment analysis and sector trends.
+
+    **Predicted Range:** Provide a realistic price range for 30 days (e.g., ₹1500 - ₹1650). If no current price available, state "Unable to provide specific range due to data limitations."
+
+    **Justification:** Explain your forecast based on available information.
+
+    **Confidence:** High/Moderate/Low based on data quality and availability.
+
+    ## Investment Thesis
+
+    **Bull Case:**
+    - Point 1 based on positive signals from available data
+    - Point 2 based on news sentiment or market conditions
+    - Point 3 if sufficient data available
+
+    **Bear Case:**
+    - Point 1 based on negative signals or risks
+    - Point 2 based on market concerns
+    - Point 3 if sufficient data available
+
+    ## Actionable Strategy
+
+    **Signal:** Buy/Sell/Hold (choose one)
+
+    **Strategy:** Provide 1-2 sentences with specific actionable advice based on the analysis above.
+
+    **Risk Management:** Brief note on stop-loss or position sizing if relevant.
     """
-    Uses Gemini 1.5 Flash to analyze historical data and news to generate
-    a forecast and a complete investment thesis.
+)
+
+# Daily history behind the prompt's price summary. The same period as the
+# forecast, so both read the same cached bars; the 52-week and SMA200
+# features need a year of them. Batches prefetch this period too.
+HISTORY_PERIOD = "2y"
+
+MAX_HEADLINES = 10
+MAX_HEADLINE_CHARS = 160
+NO_NEWS_TEXT = "No recent news or social media mentions found."
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), used for budgeting."""
+    return (len(text) + 3) // 4
+
+def _headline_line(article: Dict[str, Any]) -> str:
+    title = " ".join(article['title'].split())
+    if len(title) > MAX_HEADLINE_CHARS:
+        title = title[:MAX_HEADLINE_CHARS - 3] + "..."
+    return f"- {title} ({article['source']}, {article['sentiment']})"
+
+def build_analyst_prompt(ticker: str, company_name: str, historical_data_text: str,
+                         articles: List[Dict[str, Any]], token_budget: Optional[int] = None) -> Tuple[str, List[Dict[str, Any]]]:
     """
-    print(f"Starting LLM-powered analysis for {ticker} with Gemini 1.5 Flash...")
+    Renders ANALYST_PROMPT with the price summary and as many of the first
+    MAX_HEADLINES headlines as fit in `token_budget` (LLM_PROMPT_TOKEN_BUDGET
+    by default). Returns the prompt and the articles it includes.
+    """
+    budget = token_budget or settings.LLM_PROMPT_TOKEN_BUDGET
+
+    def render(lines: List[str]) -> str:
+        return ANALYST_PROMPT.format(
+            ticker=ticker,
+            company_name=company_name,
+            historical_data=historical_data_text,
+            news_summary="\n".join(lines) or NO_NEWS_TEXT,
+        )
+
+    lines, included = [], []
+    prompt = render(lines)
+    for article in articles[:MAX_HEADLINES]:
+        candidate = render(lines + [_headline_line(article)])
+        if estimate_tokens(candidate) > budget:
+            break
+        lines.append(_headline_line(article))
+        included.append(article)
+        prompt = candidate
+    return prompt, included
+
+# --- Report cache ---
+# Exact entries are keyed by the rendered prompt; near-duplicate entries by
+# everything except the headlines, and remember which headlines they saw.
+_report_cache = TieredCache("llm-report", 500, settings.LLM_CACHE_TTL)
+REPORT_CACHE_STATS_KEY = "llm-cache:stats"
 
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def _headline_signature(articles: List[Dict[str, Any]]) -> List[str]:
+    return sorted({_digest(" ".join(a['title'].lower().split()))[:16] for a in articles})
+
+def _overlap(a: List[str], b: List[str]) -> float:
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+def _record_cache_stat(name: str):
+    try:
+        get_redis().hincrby(REPORT_CACHE_STATS_KEY, name, 1)
+    except redis.RedisError as e:
+        logger.warning(f"Could not record LLM cache stats: {e}")
+
+def summarize_report_cache_stats(raw: Mapping) -> Dict[str, Any]:
+    """Decodes the REPORT_CACHE_STATS_KEY hash and adds the hit rate."""
+    stats = {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()}
+    for name in ("exact_hits", "near_hits", "misses", "bypassed"):
+        stats.setdefault(name, 0)
+    lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["exact_hits"] + stats["near_hits"]) / lookups, 3) if lookups else 0.0
+    return stats
+
+def _cached_report(prompt_key: str, near_key: str, headlines: List[str]) -> Optional[str]:
+    entry = _report_cache.get(prompt_key)
+    if entry is not None:
+        _record_cache_stat("exact_hits")
+        return entry["report"]
+    if settings.LLM_CACHE_NEAR_DUPLICATE:
+        entry = _report_cache.get(near_key)
+        if entry is not None and _overlap(entry["headlines"], headlines) >= settings.LLM_CACHE_NEAR_DUPLICATE_THRESHOLD:
+            _record_cache_stat("near_hits")
+            return entry["report"]
+    _record_cache_stat("misses")
+    return None
+
+def get_historical_data_text(ticker: str) -> Tuple[str, str, bool]:
+    """
+    Downloads the daily bars used as LLM context. Returns the resolved Yahoo
+    ticker (NSE, or BSE as a fallback), a compact technical summary of the
+    bars for the prompt (see tools.price_features), and whether the bars were
+    fetched at all; when they weren't, the text is a fallback from ticker info.
+    Kept separate from the LLM call so the pipeline can run it concurrently
+    with the other data stages.
+    """
     # clean and format ticker properly
     original_ticker = ticker
     if not ticker.endswith(('.NS', '.BO', '.L', '.TO')):
@@ -21,18 +177,22 @@ def get_llm_analysis(ticker: str, company_name: str, intelligence_briefing: Dict
         print(f"Formatted ticker from '{original_ticker}' to '{ticker}' for Yahoo Finance")
 
     historical_data_text = "Could not fetch historical price data due to repeated errors."
+    has_bars = False
     
     for attempt in range(3):
         try:
             print(f"Attempt {attempt + 1}/3 to download historical data for {ticker}...")
-            stock_data = yf.download(ticker, period="100d", interval="1d", progress=False)
+            # Record array straight from the OHLCV store, no DataFrame in between
+            bars = get_price_bars(ticker, HISTORY_PERIOD)
+            valid = ~np.isnan(bars['high'] + bars['low'] + bars['close'])
+            if not valid.all():
+                bars = bars[valid]  # copies, so only when there are gaps
             
-            if not stock_data.empty:
-                # Convert to a more readable format for the LLM
-                stock_data = stock_data.round(2)  # Round to 2 decimal places
-                # Include only the last 20 days for LLM context efficiency
-                recent_data = stock_data.tail(20)
-                historical_data_text = f"Recent 20 days of data for {ticker}:\n{recent_data.to_string()}"
+            if len(bars):
+                # A few derived numbers instead of the raw table: far fewer tokens
+                features = compute_features(bars['high'], bars['low'], bars['close'], np.nan_to_num(bars['volume']))
+                historical_data_text = format_features(ticker, str(bars['date'][-1]), features)
+                has_bars = True
                 print("-> Successfully downloaded historical data.")
                 break
             else:
@@ -49,11 +209,10 @@ def get_llm_analysis(ticker: str, company_name: str, intelligence_briefing: Dict
                 time.sleep(2)
 
     # If all attempts failed, check if we can get basic info
-    if "Could not fetch historical price data" in historical_data_text:
+    if not has_bars:
         try:
             print("Attempting to get basic stock info as fallback...")
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            info = get_ticker_info(ticker)
             if info and info.get('regularMarketPrice'):
                 current_price = info.get('regularMarketPrice')
                 previous_close = info.get('previousClose', current_price)
@@ -64,87 +223,58 @@ def get_llm_analysis(ticker: str, company_name: str, intelligence_briefing: Dict
         except Exception as e:
             print(f"-> Fallback also failed: {e}")
 
-    # 2. Summarize the news data into a simple text block
-    articles = intelligence_briefing.get('articles', [])
-    if articles:
-        news_summary = "\n".join([f"- {article['title']} (Source: {article['source']}, Sentiment: {article['sentiment']})" for article in articles[:10]])  # Limit to 10 articles
-    else:
-        news_summary = "No recent news or social media mentions found."
-
-    # 3. Initialize the LLM
-    try:
-        llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash-latest", temperature=0.3)
-    except Exception as e:
-        print(f"Error initializing Gemini: {e}")
-        return {"error": f"Failed to initialize Gemini API: {str(e)}"}
-
-    # 4. Enhanced prompt that handles missing data gracefully
-    prompt = PromptTemplate(
-        input_variables=["ticker", "company_name", "historical_data", "news_summary"],
-        template="""
-        You are a Senior Financial Analyst for an Indian market-focused investment fund.
-        Your task is to provide a comprehensive analysis and a 30-day forecast for the stock: {ticker} ({company_name}).
-        
-        **Important Instructions:**
-        - If historical data is limited or unavailable, focus your analysis on news sentiment and general market conditions
-        - Always provide a forecast range even with limited data, but adjust confidence accordingly
-        - Base your analysis ONLY on the provided data
-
-        **Data Provided:**
-
-        1.  **Historical Price Data:**
-            ```
-            {historical_data}
-            ```
-
-        2.  **Recent News & Social Media Headlines:**
-            {news_summary}
+    return ticker, historical_data_text, has_bars
 
-        **Your Analysis Report (in Markdown format):**
-
-        ## 30-Day Price Forecast
-
-        **Analysis:** Analyze available data (price trends if available, news sentiment, market conditions). If price data is limited, focus on sentiment analysis and sector trends.
-
-        **Predicted Range:** Provide a realistic price range for 30 days (e.g., ₹1500 - ₹1650). If no current price available, state "Unable to provide specific range due to data limitations."
-
-        **Justification:** Explain your forecast based on available information.
-
-        **Confidence:** High/Moderate/Low based on data quality and availability.
-
-        ## Investment Thesis
-
-        **Bull Case:**
-        - Point 1 based on positive signals from available data
-        - Point 2 based on news sentiment or market conditions
-        - Point 3 if sufficient data available
+def get_llm_analysis(ticker: str, company_name: str, intelligence_briefing: Dict[str, Any],
+                     historical_data: Optional[Tuple[str, str, bool]] = None, use_cache: bool = True,
+                     on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    Uses Gemini 1.5 Flash to analyze historical data and news to generate
+    a forecast and a complete investment thesis.
 
-        **Bear Case:**
-        - Point 1 based on negative signals or risks
-        - Point 2 based on market concerns
-        - Point 3 if sufficient data available
+    `historical_data` is the (ticker, text, has_bars) from get_historical_data_text;
+    it is downloaded here when the caller hasn't already fetched it.
+    A cached report for the same inputs is reused unless `use_cache` is False.
+    `on_text` streams the report as it is generated (see llm_gateway.generate).
+    """
+    print(f"Starting LLM-powered analysis for {ticker} with Gemini 1.5 Flash...")
 
-        ## Actionable Strategy
+    # 1. Historical price data (may already have been fetched in parallel)
+    if historical_data is None:
+        historical_data = get_historical_data_text(ticker)
+    ticker, historical_data_text, has_bars = historical_data
 
-        **Signal:** Buy/Sell/Hold (choose one)
+    # 2. Render the shared prompt with as many headlines as the token budget allows
+    articles = intelligence_briefing.get('articles', [])
+    prompt, included = build_analyst_prompt(ticker, company_name, historical_data_text, articles)
+    print(f"Prompt is ~{estimate_tokens(prompt)} tokens with {len(included)}/{len(articles)} headlines.")
 
-        **Strategy:** Provide 1-2 sentences with specific actionable advice based on the analysis above.
+    # 3. Send it through the LLM gateway (or reuse a cached report)
+    model, temperature = settings.LLM_MODEL, 0.3
+    prompt_key = _digest(model, str(temperature), prompt)
+    near_key = _digest(model, str(temperature), ticker, company_name, historical_data_text)
+    headlines = _headline_signature(included)
 
-        **Risk Management:** Brief note on stop-loss or position sizing if relevant.
-        """
-    )
+    if not use_cache:
+        _record_cache_stat("bypassed")
+    elif settings.LLM_CACHE_ENABLED:
+        report = _cached_report(prompt_key, near_key, headlines)
+        if report is not None:
+            print("Reusing cached analysis for unchanged inputs.")
+            return {"llm_report": report}
 
-    # 5. Run the LangChain chain with error handling
-    chain = LLMChain(llm=llm, prompt=prompt)
     try:
-        response = chain.run(
-            ticker=ticker,
-            company_name=company_name,
-            historical_data=historical_data_text,
-            news_summary=news_summary
-        )
+        response = generate(prompt, model=model, temperature=temperature, on_text=on_text)
         print("Successfully generated analysis from Gemini.")
-        return {"llm_report": response}
+        # A report written without price bars (even on the ticker-info
+        # fallback) shouldn't outlive the outage
+        if settings.LLM_CACHE_ENABLED and has_bars:
+            # Fresh while the inputs can change intraday; until the next open after the close
+            _report_cache.set_many({
+                prompt_key: {"report": response["text"]},
+                near_key: {"report": response["text"], "headlines": headlines},
+            }, ttl=market_ttl(settings.LLM_CACHE_TTL))
+        return {"llm_report": response["text"]}
     except Exception as e:
         error_msg = f"Failed to generate analysis from Gemini: {str(e)}"
         print(f"Error calling Gemini API: {e}")
@@ -0,0 +1,59 @@
+from tools.prediction_tools import history_frame, prophet_forecast, numpy_forecasts
+import numpy as np
+import sys
+import time
+
+# NSE tickers used when none are given on the command line
+SAMPLE_TICKERS = [
+    "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS", "ICICIBANK.NS",
+    "HINDUNILVR.NS", "ITC.NS", "SBIN.NS", "BHARTIARTL.NS", "LT.NS",
+]
+HOLDOUT_DAYS = 30
+
+def holdout_errors(forecast, holdout):
+    """MAPE (%) and 80%-interval coverage on the held-out trading days."""
+    matched = forecast.set_index('ds').reindex(holdout['ds']).dropna()
+    actual = holdout.set_index('ds').loc[matched.index, 'y'].to_numpy()
+    mape = 100 * np.mean(np.abs(matched['yhat'].to_numpy() - actual) / actual)
+    covered = np.mean((actual >= matched['yhat_lower'].to_numpy()) & (actual <= matched['yhat_upper'].to_numpy()))
+    return mape, 100 * covered
+
+def main():
+    """
+    Compares the vectorized numpy engine with Prophet on NSE data: each model
+    is fitted on two years of closes minus the last HOLDOUT_DAYS calendar days
+    and scored on those days. Prophet fits one ticker at a time; the numpy
+    engine fits all of them in one batch.
+    """
+    tickers = sys.argv[1:] or SAMPLE_TICKERS
+    train, holdout = {}, {}
+    for ticker in tickers:
+        frame = history_frame(ticker)
+        if frame.empty:
+            print(f"Skipping {ticker}: no data")
+            continue
+        cutoff = frame['ds'].iloc[-1] - np.timedelta64(HOLDOUT_DAYS, 'D')
+        train[ticker], holdout[ticker] = frame[frame['ds'] <= cutoff], frame[frame['ds'] > cutoff]
+
+    started = time.perf_counter()
+    prophet_results = {ticker: prophet_forecast(frame) for ticker, frame in train.items()}
+    prophet_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    numpy_results = dict(zip(train, numpy_forecasts(list(train.values()))))
+    numpy_seconds = time.perf_counter() - started
+
+    print(f"Fit + predict for {len(train)} tickers: prophet {prophet_seconds:.2f}s, "
+          f"numpy {numpy_seconds:.3f}s ({prophet_seconds / numpy_seconds:.0f}x faster)")
+    print(f"{'ticker':>15} {'prophet MAPE':>13} {'numpy MAPE':>11} {'prophet cov':>12} {'numpy cov':>10}")
+    totals = np.zeros(4)
+    for ticker in train:
+        prophet_mape, prophet_cov = holdout_errors(prophet_results[ticker], holdout[ticker])
+        numpy_mape, numpy_cov = holdout_errors(numpy_results[ticker], holdout[ticker])
+        totals += (prophet_mape, numpy_mape, prophet_cov, numpy_cov)
+        print(f"{ticker:>15} {prophet_mape:12.2f}% {numpy_mape:10.2f}% {prophet_cov:11.0f}% {numpy_cov:9.0f}%")
+    mean = totals / max(len(train), 1)
+    print(f"{'mean':>15} {mean[0]:12.2f}% {mean[1]:10.2f}% {mean[2]:11.0f}% {mean[3]:9.0f}%")
+
+if __name__ == "__main__":
+    main()
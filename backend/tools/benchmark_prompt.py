@@ -0,0 +1,48 @@
+from core.llm_gateway import get_llm
+from core.config import settings
+from tools.analyst_tools import ANALYST_PROMPT, build_analyst_prompt, estimate_tokens, get_historical_data_text
+from tools.benchmark_forecast import SAMPLE_TICKERS
+from tools.market_data_tools import get_price_history, yahoo_symbol
+import argparse
+
+def legacy_history_text(ticker: str) -> str:
+    """The price block the analyst prompt used to carry: the last 20 bars as a printed table."""
+    recent_data = get_price_history(yahoo_symbol(ticker), period="100d", interval="1d").round(2).tail(20)
+    return f"Recent 20 days of data for {ticker}:\n{recent_data.to_string()}"
+
+def main():
+    """
+    Prompt size of the analyst prompt before and after compaction, per ticker:
+    the old printed 20-bar table against the price-feature summary, with the
+    same sample headlines. Estimates by default; --exact asks the model's
+    token counter instead (needs GOOGLE_API_KEY).
+    """
+    parser = argparse.ArgumentParser(description="Analyst prompt token counts before and after compaction")
+    parser.add_argument("tickers", nargs="*", default=SAMPLE_TICKERS)
+    parser.add_argument("--exact", action="store_true")
+    args = parser.parse_args()
+
+    count = get_llm(settings.LLM_MODEL, 0.3).get_num_tokens if args.exact else estimate_tokens
+    # Ten typical headlines, so both prompts carry the same news
+    articles = [
+        {"title": f"Sample headline {i} about quarterly results, guidance and sector outlook", "source": "Google News", "sentiment": "neutral"}
+        for i in range(10)
+    ]
+    legacy_news = "\n".join(f"- {a['title']} (Source: {a['source']}, Sentiment: {a['sentiment']})" for a in articles)
+
+    totals = [0, 0]
+    print(f"{'ticker':>15} {'before':>8} {'after':>8} {'saved':>7}")
+    for ticker in args.tickers:
+        legacy = ANALYST_PROMPT.format(ticker=ticker, company_name=ticker,
+                                       historical_data=legacy_history_text(ticker), news_summary=legacy_news)
+        resolved, history_text, _ = get_historical_data_text(ticker)
+        compact, _ = build_analyst_prompt(resolved, ticker, history_text, articles)
+        before, after = count(legacy), count(compact)
+        totals[0] += before
+        totals[1] += after
+        print(f"{ticker:>15} {before:8d} {after:8d} {100 * (1 - after / before):6.0f}%")
+    if args.tickers:
+        print(f"{'total':>15} {totals[0]:8d} {totals[1]:8d} {100 * (1 - totals[1] / totals[0]):6.0f}%")
+
+if __name__ == "__main__":
+    main()
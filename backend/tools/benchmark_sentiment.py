@@ -0,0 +1,66 @@
+from transformers import pipeline
+from tools.sentiment_tools import MODEL_PATH, OnnxSentimentClassifier
+import statistics
+import sys
+import time
+
+# Headlines used when no file is given. Pass a text file with one headline
+# per line to benchmark on real scraped titles instead.
+SAMPLE_TITLES = [
+    "Reliance Industries shares rise 3% after strong quarterly results",
+    "TCS wins $1 billion deal from European bank",
+    "Infosys cuts revenue guidance amid weak demand",
+    "HDFC Bank net profit jumps 20% year on year",
+    "Sensex, Nifty end flat as investors await RBI policy",
+    "Adani Ports stock falls after SEBI notice",
+    "Tata Motors reports record EV sales in September",
+    "Wipro shares slump as margins disappoint",
+    "ITC declares interim dividend of Rs 6 per share",
+    "Bharti Airtel raises tariffs, analysts see margin boost",
+]
+BATCH_SIZE = 32
+ROUNDS = 20
+
+def normalize(label: str) -> str:
+    return label.lower()
+
+def benchmark(classifier, titles, rounds: int = ROUNDS):
+    """Returns (titles/sec, p50 ms, p99 ms) for classifying `titles` in one call, `rounds` times."""
+    classifier(titles[:BATCH_SIZE], truncation=True, max_length=512, batch_size=BATCH_SIZE)  # warm-up
+    latencies = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        classifier(titles, truncation=True, max_length=512, batch_size=BATCH_SIZE)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    return len(titles) * rounds / sum(latencies), 1000 * statistics.median(latencies), 1000 * p99
+
+def main():
+    """
+    Compares the INT8 ONNX backend with the PyTorch pipeline: label agreement
+    on the same titles, then throughput and latency for each backend.
+    """
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            titles = [line.strip() for line in f if line.strip()]
+    else:
+        titles = SAMPLE_TITLES * 6
+
+    print(f"Loading PyTorch pipeline from {MODEL_PATH}")
+    torch_classifier = pipeline('text-classification', model=MODEL_PATH, tokenizer=MODEL_PATH)
+    print("Loading ONNX classifier (exports and quantizes on first run)")
+    onnx_classifier = OnnxSentimentClassifier(MODEL_PATH)
+
+    torch_labels = torch_classifier(titles, truncation=True, max_length=512, batch_size=BATCH_SIZE)
+    onnx_labels = onnx_classifier(titles, truncation=True, max_length=512, batch_size=BATCH_SIZE)
+    agree = sum(normalize(a['label']) == normalize(b['label']) for a, b in zip(torch_labels, onnx_labels))
+    max_score_diff = max(abs(a['score'] - b['score']) for a, b in zip(torch_labels, onnx_labels))
+    print(f"Label agreement: {agree}/{len(titles)} ({100 * agree / len(titles):.1f}%), max score difference {max_score_diff:.3f}")
+
+    for name, classifier in (("pytorch", torch_classifier), ("onnx-int8", onnx_classifier)):
+        throughput, p50, p99 = benchmark(classifier, titles)
+        print(f"{name:>10}: {throughput:8.1f} titles/sec, p50 {p50:7.1f} ms, p99 {p99:7.1f} ms per {len(titles)}-title call")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,12 @@
-import yfinance as yf
+from tools.market_data_tools import get_ticker_info
 from typing import Dict, Any
 
 def get_stock_data(ticker: str) -> Dict[str, Any]:
     if not ticker.endswith(('.NS', '.BO')):
         ticker = f"{ticker}.NS"
 
-    stock = yf.Ticker(ticker)
-    
     try:
-        info = stock.info
+        info = get_ticker_info(ticker)
     except Exception as e:
         print(f"Could not fetch info for {ticker}: {e}")
         return {"error": f"Invalid ticker or no data available for {ticker}"}
@@ -0,0 +1,112 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Canned report in the shape the analyst prompt asks for
+FAKE_REPORT = """## 30-Day Price Forecast
+
+**Analysis:** Fake analysis for load testing.
+
+**Predicted Range:** Unable to provide specific range due to data limitations.
+
+**Confidence:** Low
+
+## Investment Thesis
+
+**Bull Case:**
+- Placeholder
+
+**Bear Case:**
+- Placeholder
+
+## Actionable Strategy
+
+**Signal:** Hold
+"""
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST {"prompt", ...} with {"text", "input_tokens", "output_tokens"}
+    after a simulated latency. With "stream": true the report is sent as
+    {"text": piece} lines over the same latency (the first one after
+    --first-token seconds), followed by the token counts. Requests beyond
+    --max-concurrency in flight, and a random --rate-limit share of the rest,
+    get 429 with a Retry-After header.
+    """
+    in_flight = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        # The random 429 is decided before admission, so a rejected request never holds a slot
+        with self.lock:
+            rejected = (random.random() < self.server.rate_limit
+                        or FakeLLMHandler.in_flight >= self.server.max_concurrency)
+            if not rejected:
+                FakeLLMHandler.in_flight += 1
+        if rejected:
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.server.retry_after))
+            self.end_headers()
+            return
+        # Rough count: about four characters per token
+        usage = {"input_tokens": len(body.get("prompt", "")) // 4, "output_tokens": len(FAKE_REPORT) // 4}
+        try:
+            if body.get("stream"):
+                self.stream_report(usage)
+                return
+            time.sleep(self.server.latency)
+            payload = json.dumps({"text": FAKE_REPORT, **usage}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with self.lock:
+                FakeLLMHandler.in_flight -= 1
+
+    def stream_report(self, usage):
+        pieces = FAKE_REPORT.splitlines(keepends=True)
+        first_token = min(self.server.first_token, self.server.latency)
+        # No Content-Length: the body ends when the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(first_token)
+        for piece in pieces:
+            self.wfile.write(json.dumps({"text": piece}).encode() + b"\n")
+            self.wfile.flush()
+            time.sleep((self.server.latency - first_token) / len(pieces))
+        self.wfile.write(json.dumps(usage).encode() + b"\n")
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    """
+    Local stand-in for Gemini, e.g.:
+        python -m tools.fake_llm_server --port 8099 --latency 3 --max-concurrency 4
+    then run the workers with LLM_FAKE_URL=http://localhost:8099/generate
+    """
+    parser = argparse.ArgumentParser(description="Fake LLM server for gateway tests")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--first-token", type=float, default=0.5, help="seconds before the first streamed chunk")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=2)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), FakeLLMHandler)
+    server.latency, server.first_token, server.max_concurrency = args.latency, args.first_token, args.max_concurrency
+    server.rate_limit, server.retry_after = args.rate_limit, args.retry_after
+    print(f"Fake LLM server on :{args.port} ({args.latency}s latency, {args.max_concurrency} concurrent)")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Vectorized stand-in for Prophet: piecewise-linear trend plus Fourier weekly
+# and yearly seasonality, fitted for many series at once with one batched
+# ridge solve. The ridge penalties play the role of Prophet's priors.
+N_CHANGEPOINTS = 25
+CHANGEPOINT_RANGE = 0.8
+WEEKLY_ORDER = 3
+YEARLY_ORDER = 10
+INTERVAL_WIDTH = 0.80
+# Two-sided z-score for INTERVAL_WIDTH
+INTERVAL_Z = 1.2816
+# Fewest observations per series fit_batch accepts
+MIN_OBSERVATIONS = 2 * N_CHANGEPOINTS
+# Yearly terms need at least one full cycle; shorter series get none instead
+# of extrapolating a fitted wiggle. The two-year histories the jobs and the
+# benchmark fit clear this, as fit_prophet's yearly_seasonality=True assumes.
+# Over one to two cycles the seasonality penalty keeps the terms small.
+YEARLY_MIN_SPAN_DAYS = 365
+
+def fourier_features(days: np.ndarray, period: float, order: int) -> np.ndarray:
+    """sin/cos terms of `days` (days since the epoch) for harmonics 1..order; adds a last axis."""
+    angles = 2 * np.pi * days[..., None] * np.arange(1, order + 1) / period
+    return np.concatenate([np.sin(angles), np.cos(angles)], axis=-1)
+
+def _design(t: np.ndarray, days: np.ndarray, changepoints: np.ndarray, yearly: np.ndarray) -> np.ndarray:
+    # t and days are (B, L), changepoints (B, C), yearly a (B,) mask; returns (B, L, P).
+    # Masked-out yearly columns are zero, so their (penalized) coefficients fit to zero.
+    hinges = np.maximum(t[..., None] - changepoints[:, None, :], 0)
+    return np.concatenate([
+        np.ones(t.shape + (1,)),
+        t[..., None],
+        hinges,
+        fourier_features(days, 7.0, WEEKLY_ORDER),
+        fourier_features(days, 365.25, YEARLY_ORDER) * yearly[:, None, None],
+    ], axis=-1)
+
+def _penalties(noise_var: np.ndarray, changepoint_prior_scale: float, seasonality_prior_scale: float) -> np.ndarray:
+    # Gaussian-prior ridge: lambda = noise variance / prior variance per coefficient
+    n_seasonal = 2 * (WEEKLY_ORDER + YEARLY_ORDER)
+    prior_var = np.concatenate([
+        np.full(2, 1e6),  # intercept and base slope are effectively unpenalized
+        np.full(N_CHANGEPOINTS, changepoint_prior_scale ** 2),
+        np.full(n_seasonal, seasonality_prior_scale ** 2),
+    ])
+    return noise_var[:, None] / prior_var
+
+def _pad(arrays: Sequence[np.ndarray], length: int, fill_last: bool) -> np.ndarray:
+    out = np.zeros((len(arrays), length))
+    for i, a in enumerate(arrays):
+        out[i, :len(a)] = a
+        if fill_last:
+            out[i, len(a):] = a[-1]
+    return out
+
+def fit_batch(dates: Sequence[np.ndarray], values: Sequence[np.ndarray],
+              changepoint_prior_scale: float = 0.05, seasonality_prior_scale: float = 10.0) -> List[Dict[str, Any]]:
+    """
+    Fits one model per series. `dates` are datetime64[D] arrays, `values` the
+    matching observations; series may differ in length. Returns one parameter
+    dict per series for predict(). All series are solved together: shorter
+    ones are zero-weighted past their end.
+    """
+    lengths = np.array([len(v) for v in values])
+    if lengths.min() < MIN_OBSERVATIONS:
+        raise ValueError(f"Need at least {MIN_OBSERVATIONS} observations per series")
+    length = int(lengths.max())
+
+    days = _pad([d.astype('datetime64[D]').astype(np.int64) for d in dates], length, fill_last=True)
+    y = _pad([np.asarray(v, dtype='f8') for v in values], length, fill_last=True)
+    weights = (np.arange(length) < lengths[:, None]).astype('f8')
+
+    start, span = days[:, 0], days[np.arange(len(lengths)), lengths - 1] - days[:, 0]
+    t = (days - start[:, None]) / span[:, None]
+    y_scale = np.abs(y * weights).max(axis=1)
+    y_scaled = y / y_scale[:, None]
+
+    # Changepoints at evenly spaced rows of the first CHANGEPOINT_RANGE of each history
+    rows = np.linspace(0, CHANGEPOINT_RANGE, N_CHANGEPOINTS + 1)[1:] * (lengths[:, None] - 1)
+    changepoints = np.take_along_axis(t, rows.round().astype(np.int64), axis=1)
+
+    yearly = (span >= YEARLY_MIN_SPAN_DAYS).astype('f8')
+    X = _design(t, days, changepoints, yearly)
+    xtx = np.einsum('blp,bl,blq->bpq', X, weights, X)
+    xty = np.einsum('blp,bl,bl->bp', X, weights, y_scaled)
+
+    # Two passes: the first estimates the noise variance the penalties are scaled by
+    noise_var = np.full(len(lengths), 0.01 ** 2)
+    for _ in range(2):
+        penalty = _penalties(noise_var, changepoint_prior_scale, seasonality_prior_scale)
+        beta = np.linalg.solve(xtx + penalty[:, :, None] * np.eye(xtx.shape[1]), xty[..., None])[..., 0]
+        residuals = (y_scaled - np.einsum('blp,bp->bl', X, beta)) * weights
+        noise_var = (residuals ** 2).sum(axis=1) / np.maximum(lengths - X.shape[2], 1)
+
+    deltas = beta[:, 2:2 + N_CHANGEPOINTS]
+    return [
+        {
+            "start_day": int(start[i]),
+            "span_days": int(span[i]),
+            "last_day": int(start[i] + span[i]),
+            "y_scale": float(y_scale[i]),
+            "changepoints": changepoints[i],
+            "yearly": bool(yearly[i]),
+            "beta": beta[i],
+            "sigma": float(np.sqrt(noise_var[i])),
+            # Future trend uncertainty, as in Prophet: new changepoints at the
+            # historical rate with the historical mean squared magnitude
+            "changepoint_rate": N_CHANGEPOINTS / CHANGEPOINT_RANGE,
+            "delta_var": float(np.mean(deltas[i] ** 2)),
+        }
+        for i in range(len(lengths))
+    ]
+
+def predict(params: Dict[str, Any], dates: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """yhat, yhat_lower and yhat_upper for `dates` (datetime64[D]) from fit_batch() params."""
+    days = dates.astype('datetime64[D]').astype(np.int64).astype('f8')
+    t = (days - params["start_day"]) / params["span_days"]
+    X = _design(t[None, :], days[None, :], np.asarray(params["changepoints"])[None, :],
+                np.array([float(params["yearly"])]))[0]
+    yhat = X @ np.asarray(params["beta"])
+
+    # Slope changes arrive as a compound Poisson process past the last observation,
+    # so the trend variance at horizon h (in scaled time) is rate * E[delta^2] * h^3 / 3
+    horizon = np.maximum(t - 1.0, 0)
+    variance = params["sigma"] ** 2 + params["changepoint_rate"] * params["delta_var"] * horizon ** 3 / 3
+    half_width = INTERVAL_Z * np.sqrt(variance)
+
+    scale = params["y_scale"]
+    return yhat * scale, (yhat - half_width) * scale, (yhat + half_width) * scale
+
+def forecast_dates(history_dates: np.ndarray, periods: int) -> np.ndarray:
+    """History dates plus `periods` calendar days, like Prophet's make_future_dataframe."""
+    last = history_dates.astype('datetime64[D]')[-1]
+    return np.concatenate([history_dates.astype('datetime64[D]'), last + np.arange(1, periods + 1)])
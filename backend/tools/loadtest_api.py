@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx  # not a runtime dependency: pip install httpx
+
+async def poller(client: httpx.AsyncClient, path: str, stop_at: float, latencies: list, errors: list):
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+            else:
+                latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+async def run(base_url: str, job_id: str, concurrency: int, duration: float, path_suffix: str = ""):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        stop_at = time.monotonic() + duration
+        await asyncio.gather(*(
+            poller(client, f"/jobs/{job_id}{path_suffix}", stop_at, latencies, errors) for _ in range(concurrency)
+        ))
+
+    latencies.sort()
+    print(f"{concurrency} concurrent pollers for {duration:.0f}s against GET /jobs/{{id}}{path_suffix}")
+    print(f"  requests/sec: {len(latencies) / duration:.1f}")
+    if latencies:
+        print(f"  latency p50: {1000 * statistics.median(latencies):.1f} ms, "
+              f"p99: {1000 * latencies[int(0.99 * (len(latencies) - 1))]:.1f} ms")
+    print(f"  errors: {len(errors)}")
+
+def main():
+    """
+    Simulates many frontend pollers hitting one job, e.g.:
+        python -m tools.loadtest_api http://localhost:8000 <job-id> --concurrency 500
+    """
+    parser = argparse.ArgumentParser(description="Load-test job polling")
+    parser.add_argument("base_url")
+    parser.add_argument("job_id")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.job_id, args.concurrency, args.duration))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import yfinance as yf
+import pandas as pd
+from core.cache import TieredCache
+from core.config import settings
+from tools.ohlcv_store import period_start, read_bars, bars_to_frame, sync_ticker, sync_start, store_bars, store_covers, frame_to_records, RECORD_DTYPE
+import numpy as np
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+import socket
+
+# --- Market-hours-aware TTLs ---
+# NSE trades 09:15-15:30 IST on weekdays. Yahoo keeps revising the day's bar
+# for a little while after the close, so the "live" window runs until 16:00.
+IST = ZoneInfo("Asia/Kolkata")
+NSE_OPEN = dt_time(9, 15)
+NSE_SETTLED = dt_time(16, 0)
+
+def is_market_live(now: Optional[datetime] = None) -> bool:
+    now = now or datetime.now(IST)
+    return now.weekday() < 5 and NSE_OPEN <= now.time() < NSE_SETTLED
+
+def market_ttl(intraday_ttl: int, now: Optional[datetime] = None) -> int:
+    """
+    Short TTL while the market is live; otherwise the data can't change until
+    the next session opens, so cache it until then (weekends included,
+    exchange holidays ignored).
+    """
+    now = now or datetime.now(IST)
+    if is_market_live(now):
+        return intraday_ttl
+    next_open = datetime.combine(now.date(), NSE_OPEN, tzinfo=IST)
+    if now >= next_open:
+        next_open += timedelta(days=1)
+    while next_open.weekday() >= 5:
+        next_open += timedelta(days=1)
+    return max(intraday_ttl, int((next_open - now).total_seconds()))
+
+_market_cache = TieredCache("marketdata", settings.MARKET_DATA_CACHE_SIZE, settings.MARKET_DATA_HISTORY_TTL)
+
+def get_market_cache_stats() -> Dict[str, Any]:
+    return _market_cache.stats()
+
+# --- DataFrame <-> JSON ---
+def _frame_to_json(df: pd.DataFrame) -> Dict[str, Any]:
+    df = df.copy()
+    # yf.download returns (field, ticker) columns; we only ever ask for one ticker
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    return {
+        "index_name": df.index.name,
+        "index": [ts.isoformat() for ts in df.index],
+        "columns": list(df.columns),
+        "data": df.values.tolist(),
+    }
+
+def _frame_from_json(payload: Dict[str, Any]) -> pd.DataFrame:
+    index = pd.DatetimeIndex(pd.to_datetime(payload["index"]), name=payload["index_name"])
+    return pd.DataFrame(payload["data"], index=index, columns=payload["columns"])
+
+def yahoo_symbol(ticker: str) -> str:
+    """Yahoo symbol for a user-entered ticker (NSE unless already suffixed)."""
+    return ticker if ticker.endswith(('.NS', '.BO')) else f"{ticker}.NS"
+
+# --- Cached accessors used by the tools ---
+def get_ticker_info(ticker: str) -> Dict[str, Any]:
+    """
+    yf.Ticker(ticker).info, shared across jobs and workers. Like empty history
+    downloads, info without a price (what Yahoo serves when throttling or on a
+    transient failure) is not cached and comes back as {}.
+    """
+    key = f"info:{ticker}"
+
+    def fetch():
+        info = yf.Ticker(ticker).info
+        if not info or (info.get('regularMarketPrice') is None and info.get('currentPrice') is None):
+            return None
+        return info
+
+    return _market_cache.get_or_compute(key, fetch, ttl=market_ttl(settings.MARKET_DATA_INFO_TTL)) or {}
+
+def is_history_stored(ticker: str, period: str) -> bool:
+    """
+    Whether daily bars for `period` are already local: in the OHLCV store
+    (a read then at most tops up the latest bars) or in the download cache.
+    """
+    if settings.OHLCV_STORE_ENABLED:
+        return store_covers(ticker, period_start(period))
+    return _market_cache.get(f"history:{ticker}:{period}:1d") is not None
+
+def get_price_history(ticker: str, period: str = "2y", interval: str = "1d") -> pd.DataFrame:
+    """
+    yf.download(ticker, period, interval) with flattened single-level columns,
+    shared across jobs and workers. Daily bars come from the local OHLCV store,
+    which only downloads the bars it is missing. Empty downloads are not cached.
+    """
+    if interval == "1d" and settings.OHLCV_STORE_ENABLED:
+        return _get_stored_history(ticker, period)
+
+    key = f"history:{ticker}:{period}:{interval}"
+
+    def fetch():
+        stock_data = yf.download(ticker, period=period, interval=interval, progress=False)
+        return None if stock_data.empty else _frame_to_json(stock_data)
+
+    payload = _market_cache.get_or_compute(key, fetch, ttl=market_ttl(settings.MARKET_DATA_HISTORY_TTL))
+    return pd.DataFrame() if payload is None else _frame_from_json(payload)
+
+def _sync_key(ticker: str, start: np.datetime64) -> str:
+    # The store is per host, so the "recently synced" marker is too
+    return f"ohlcv-sync:{socket.gethostname()}:{ticker}:{start}"
+
+def _sync_stored_history(ticker: str, start: np.datetime64):
+    # Same market-hours TTL and coalescing as the cached downloads. A sync
+    # always re-fetches the last stored bar, so fetching nothing means the
+    # download failed or came back empty: like an empty download, that isn't
+    # cached, and the next read tries again.
+    def sync():
+        fetched = sync_ticker(ticker, start)
+        return True if fetched and store_covers(ticker, start) else None
+
+    _market_cache.get_or_compute(
+        _sync_key(ticker, start),
+        sync,
+        ttl=market_ttl(settings.MARKET_DATA_HISTORY_TTL),
+    )
+
+def _get_stored_history(ticker: str, period: str) -> pd.DataFrame:
+    start = period_start(period)
+    _sync_stored_history(ticker, start)
+    return bars_to_frame(read_bars(ticker, start))
+
+def get_price_bars(ticker: str, period: str) -> np.ndarray:
+    """
+    Daily bars for `period` as an ohlcv_store record array: a view of the
+    store when it is enabled (no DataFrame is built), otherwise converted
+    from the cached download.
+    """
+    if settings.OHLCV_STORE_ENABLED:
+        start = period_start(period)
+        _sync_stored_history(ticker, start)
+        return read_bars(ticker, start)
+    stock_data = get_price_history(ticker, period=period)
+    return frame_to_records(stock_data) if not stock_data.empty else np.empty(0, dtype=RECORD_DTYPE)
+
+def get_price_range(ticker: str, start: np.datetime64, end: Optional[np.datetime64] = None) -> np.ndarray:
+    """
+    Daily bars from `start` to `end` (inclusive) as an ohlcv_store record
+    array; a zero-copy view of the store when it is enabled.
+    """
+    if settings.OHLCV_STORE_ENABLED:
+        _sync_stored_history(ticker, start)
+        bars = read_bars(ticker, start)
+    else:
+        stock_data = yf.download(ticker, start=str(start), interval="1d", progress=False)
+        bars = frame_to_records(stock_data) if not stock_data.empty else np.empty(0, dtype=RECORD_DTYPE)
+    if end is not None:
+        bars = bars[:np.searchsorted(bars['date'], end, side='right')]
+    return bars
+
+def _download_frames(tickers: List[str], start: np.datetime64) -> Iterator[Tuple[str, pd.DataFrame]]:
+    # One multi-ticker yf.download, split back into each ticker's frame
+    df = yf.download(tickers, start=str(start), interval="1d", group_by="ticker", progress=False)
+    for ticker in tickers:
+        if isinstance(df.columns, pd.MultiIndex):
+            frame = df[ticker] if ticker in df.columns.get_level_values(0) else pd.DataFrame()
+        else:
+            frame = df
+        yield ticker, frame.dropna(how="all")
+
+def prefetch_price_history(tickers: List[str], periods: Sequence[str] = ("100d",)) -> Dict[str, int]:
+    """
+    Downloads daily bars for many tickers in multi-ticker yf.download calls
+    and seeds the store (or the cache), so the get_price_history(ticker, period)
+    calls that follow for these periods don't download anything. Returns the
+    number of bars fetched per ticker.
+    """
+    starts = {period: period_start(period) for period in periods}
+    start = min(starts.values())
+    ttl = market_ttl(settings.MARKET_DATA_HISTORY_TTL)
+
+    counts = {}
+    if not settings.OHLCV_STORE_ENABLED:
+        for ticker, frame in _download_frames(tickers, start):
+            counts[ticker] = len(frame)
+            if not frame.empty:
+                _market_cache.set_many({
+                    f"history:{ticker}:{period}:1d": _frame_to_json(frame[frame.index >= pd.Timestamp(period_start_)])
+                    for period, period_start_ in starts.items()
+                }, ttl=ttl)
+        return counts
+
+    # Like sync_ticker, tickers already stored back to `start` are only topped
+    # up from their last bars; the rest are backfilled. One download per group.
+    fetch_from = {ticker: sync_start(ticker, start) for ticker in tickers}
+    groups: Dict[bool, List[str]] = {}
+    for ticker in tickers:
+        groups.setdefault(bool(fetch_from[ticker] > start), []).append(ticker)
+    for top_up, group in groups.items():
+        group_start = min(fetch_from[ticker] for ticker in group)
+        for ticker, frame in _download_frames(group, group_start):
+            counts[ticker] = 0 if frame.empty else store_bars(ticker, frame_to_records(frame), start, group_start)
+            # As in _sync_stored_history, only a sync that brought the store up to date is remembered
+            if counts[ticker] and store_covers(ticker, start):
+                _market_cache.set_many({_sync_key(ticker, period_start_): True for period_start_ in starts.values()}, ttl=ttl)
+    return counts
@@ -1,51 +1,116 @@
 import yfinance as yf
-import requests
 from bs4 import BeautifulSoup
-from transformers import pipeline
+from concurrent.futures import ThreadPoolExecutor, wait
+from core.cache import TieredCache
+from core.config import settings
+from core.http_client import PooledHttpClient, get_http_client, get_pool_stats
+from tools.sentiment_tools import classify_titles, get_batcher_stats, get_sentiment_cache_stats
+import threading
 import time
 import urllib.parse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# --- Model Loading ---
-sentiment_pipeline = None
-MODEL_PATH = '/code/sentiment_model'
-
-def load_sentiment_pipeline():
-    global sentiment_pipeline
-    if sentiment_pipeline is None:
-        logger.info("Loading sentiment analysis pipeline...")
-        try:
-            # Try to load the custom model
-            sentiment_pipeline = pipeline('text-classification', model=MODEL_PATH, tokenizer=MODEL_PATH)
-            logger.info("Custom sentiment pipeline loaded.")
-        except Exception as e:
-            logger.warning(f"Could not load custom model ({e}), using default pipeline...")
-            try:
-                # Fallback to default sentiment analysis
-                sentiment_pipeline = pipeline('sentiment-analysis')
-                logger.info("Default sentiment pipeline loaded.")
-            except Exception as e2:
-                logger.error(f"Could not load any sentiment pipeline: {e2}")
-                # Create a dummy pipeline that always returns neutral
-                sentiment_pipeline = lambda texts, **kwargs: [{'label': 'NEUTRAL', 'score': 0.5} for _ in texts]
-
 # --- Helper function for making web requests ---
-def get_session():
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Connection': 'keep-alive',
-    })
-    return session
+def get_session() -> PooledHttpClient:
+    """Shared keep-alive client for this worker process (see core.http_client)."""
+    return get_http_client()
+
+# --- Concurrent fetch engine ---
+# Per-host limits: (max in-flight requests, tokens per second, burst size).
+# Shared by every job in the worker process, so concurrent jobs can't
+# together exceed what a host tolerates.
+HOST_LIMITS = {
+    'www.reddit.com': (2, 2.0, 5),
+    'news.google.com': (3, 5.0, 5),
+}
+DEFAULT_HOST_LIMIT = (4, 5.0, 10)
+
+# The scrapers log and swallow their failures, so rate-limited responses are
+# counted here for callers that pace themselves (the prewarm task)
+_rate_limited = 0
+_rate_limited_lock = threading.Lock()
+
+def is_rate_limit_error(error: Exception) -> bool:
+    message = str(error)
+    return "RateLimit" in type(error).__name__ or "429" in message or "Too Many Requests" in message
+
+def _record_rate_limit():
+    global _rate_limited
+    with _rate_limited_lock:
+        _rate_limited += 1
+
+def rate_limited_count() -> int:
+    """Rate-limited source responses seen by this worker process so far."""
+    return _rate_limited
+
+class TokenBucket:
+    """Thread-safe token bucket. Callers only wait when the bucket is empty."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_for = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait_for > deadline:
+                return False
+            time.sleep(wait_for)
+
+_host_limiters: Dict[str, tuple] = {}
+_host_limiters_lock = threading.Lock()
+
+def _get_host_limiter(host: str):
+    with _host_limiters_lock:
+        if host not in _host_limiters:
+            concurrency, rate, burst = HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT)
+            _host_limiters[host] = (threading.BoundedSemaphore(concurrency), TokenBucket(rate, burst))
+        return _host_limiters[host]
+
+def limited_get(session: PooledHttpClient, url: str, deadline: Optional[float] = None, timeout: float = 15, **kwargs):
+    """
+    session.get() that respects the per-host concurrency and rate limits and
+    never runs past `deadline` (a time.monotonic() value).
+    """
+    host = urllib.parse.urlparse(url).netloc
+    semaphore, bucket = _get_host_limiter(host)
+
+    if not bucket.acquire(deadline):
+        raise TimeoutError(f"Rate limit for {host} would exceed the fetch deadline")
+
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not semaphore.acquire(timeout=remaining):
+            raise TimeoutError(f"No free connection slot for {host} before the fetch deadline")
+        timeout = max(0.1, min(timeout, deadline - time.monotonic()))
+    else:
+        semaphore.acquire()
+
+    try:
+        response = session.get(url, timeout=timeout, **kwargs)
+    finally:
+        semaphore.release()
+    # The client has already retried 429s, honouring Retry-After
+    if response.status_code == 429:
+        _record_rate_limit()
+    return response
 
 # --- PRODUCTION NEWS SCRAPING TOOLS ---
-def scrape_google_news(company_name: str) -> List[Dict[str, Any]]:
+def scrape_google_news(company_name: str, deadline: Optional[float] = None) -> List[Dict[str, Any]]:
     """Scrape Google News - this is working perfectly based on your test"""
     logger.info(f"Fetching Google News for {company_name}...")
     articles_data = []
@@ -65,7 +130,7 @@ def scrape_google_news(company_name: str) -> List[Dict[str, Any]]:
                 encoded_query = urllib.parse.quote(query)
                 url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en&gl=US&ceid=US:en"
                 
-                response = session.get(url, timeout=15)
+                response = limited_get(session, url, deadline=deadline, timeout=15)
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.content, 'xml')
                     items = soup.find_all('item')
@@ -112,61 +177,79 @@ def scrape_yahoo_finance_news(ticker: str) -> List[Dict[str, Any]]:
                     })
         
     except Exception as e:
+        if is_rate_limit_error(e):
+            _record_rate_limit()
         logger.error(f"Yahoo Finance scraping failed: {e}")
     
     logger.info(f"-> Yahoo Finance returned {len(articles_data)} articles.")
     return articles_data
 
-def scrape_reddit_mentions(company_name: str) -> List[Dict[str, Any]]:
-    """Reddit mentions scraper - working well based on your test"""
+def _search_subreddit(session: PooledHttpClient, subreddit: str, company_name: str,
+                      deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Searches one subreddit, falling back to the short query only if the exact one finds nothing."""
+    mentions_data = []
+    # Search queries that worked in your test
+    search_queries = [
+        f'"{company_name}"',
+        company_name.split()[0] if ' ' in company_name else company_name
+    ]
+
+    for query in search_queries:
+        search_url = f"https://www.reddit.com/r/{subreddit}/search.json"
+        params = {
+            'q': query,
+            'sort': 'new',
+            'limit': 10,
+            'restrict_sr': 'true',
+            't': 'month'
+        }
+
+        response = limited_get(session, search_url, deadline=deadline, params=params, timeout=10)
+        if response.status_code == 200:
+            data = response.json()
+            posts = data.get('data', {}).get('children', [])
+
+            for post in posts:
+                post_data = post.get('data', {})
+                if post_data.get('title'):
+                    mentions_data.append({
+                        "title": post_data['title'].strip(),
+                        "url": f"https://reddit.com{post_data.get('permalink', '')}",
+                        "source": f"r/{subreddit}"
+                    })
+
+            if posts:
+                break  # Found posts with this query
+
+    return mentions_data
+
+def scrape_reddit_mentions(company_name: str, deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Reddit mentions scraper - all subreddits are searched concurrently"""
     logger.info(f"Fetching Reddit mentions for {company_name}...")
     mentions_data = []
     
     try:
         session = get_session()
         subreddits = ['stocks', 'investing', 'IndiaInvestments', 'SecurityAnalysis', 'ValueInvesting']
-        
-        for subreddit in subreddits:
-            try:
-                # Search queries that worked in your test
-                search_queries = [
-                    f'"{company_name}"',
-                    company_name.split()[0] if ' ' in company_name else company_name
-                ]
-                
-                for query in search_queries:
-                    search_url = f"https://www.reddit.com/r/{subreddit}/search.json"
-                    params = {
-                        'q': query,
-                        'sort': 'new',
-                        'limit': 10,
-                        'restrict_sr': 'true',
-                        't': 'month'
-                    }
-                    
-                    response = session.get(search_url, params=params, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        posts = data.get('data', {}).get('children', [])
-                        
-                        for post in posts:
-                            post_data = post.get('data', {})
-                            if post_data.get('title'):
-                                mentions_data.append({
-                                    "title": post_data['title'].strip(),
-                                    "url": f"https://reddit.com{post_data.get('permalink', '')}",
-                                    "source": f"r/{subreddit}"
-                                })
-                        
-                        if posts:
-                            break  # Found posts with this query
-                    
-                    time.sleep(0.5)  # Rate limiting
-                    
-            except Exception as e:
-                logger.error(f"Reddit r/{subreddit} failed: {e}")
-                
-            time.sleep(1)  # Rate limiting between subreddits
+
+        # Pacing is handled by the reddit.com token bucket in limited_get
+        executor = ThreadPoolExecutor(max_workers=len(subreddits), thread_name_prefix="reddit")
+        futures = {
+            subreddit: executor.submit(_search_subreddit, session, subreddit, company_name, deadline)
+            for subreddit in subreddits
+        }
+        timeout = None if deadline is None else max(0, deadline - time.monotonic())
+        wait(futures.values(), timeout=timeout)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        # Collect in subreddit order so the output stays deterministic
+        for subreddit, future in futures.items():
+            if not future.done():
+                logger.warning(f"Reddit r/{subreddit} missed the fetch deadline")
+            elif future.exception():
+                logger.error(f"Reddit r/{subreddit} failed: {future.exception()}")
+            else:
+                mentions_data.extend(future.result())
             
     except Exception as e:
         logger.error(f"Reddit scraping failed: {e}")
@@ -175,36 +258,74 @@ def scrape_reddit_mentions(company_name: str) -> List[Dict[str, Any]]:
     return mentions_data
 
 # --- THE MAIN TOOL FUNCTION ---
-def get_combined_news_and_sentiment(ticker: str, company_name: str) -> Dict[str, Any]:
-    """Main function that combines all news sources and analyzes sentiment"""
-    logger.info(f"Starting news analysis for {ticker} ({company_name})")
-    
-    # Load sentiment pipeline
-    load_sentiment_pipeline()
+# Collected articles per ticker, shared across jobs and refreshed by the prewarm task
+_news_cache = TieredCache("news", 1000, settings.NEWS_CACHE_TTL)
+
+def news_cache_key(ticker: str) -> str:
+    return f"articles:{ticker.upper()}"
+
+def is_news_cached(ticker: str) -> bool:
+    return _news_cache.get(news_cache_key(ticker)) is not None
+
+def get_news_cache_stats() -> Dict[str, Any]:
+    return _news_cache.stats()
+
+def collect_news(ticker: str, company_name: str, refresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    Gathers articles from every source, without scoring them. Reuses the
+    ticker's cached articles unless `refresh`; empty results are not cached.
+    """
+    key = news_cache_key(ticker)
+    fetch = lambda: _collect_news_uncached(ticker, company_name) or None
+    if refresh:
+        articles = fetch()
+        if articles:
+            _news_cache.set(key, articles)
+    else:
+        articles = _news_cache.get_or_compute(key, fetch)
+    # Callers annotate the articles in place; never hand out the cached dicts
+    return [dict(item) for item in articles or []]
+
+def _collect_news_uncached(ticker: str, company_name: str) -> List[Dict[str, Any]]:
+    logger.info(f"Starting news collection for {ticker} ({company_name})")
     
     all_sources = []
     
-    # Collect from all sources (based on your successful test)
-    try:
-        google_articles = scrape_google_news(company_name)
-        all_sources.extend(google_articles)
-    except Exception as e:
-        logger.error(f"Google News failed: {e}")
-    
-    try:
-        yahoo_articles = scrape_yahoo_finance_news(ticker)
-        all_sources.extend(yahoo_articles)
-    except Exception as e:
-        logger.error(f"Yahoo Finance failed: {e}")
-    
-    try:
-        reddit_mentions = scrape_reddit_mentions(company_name)
-        all_sources.extend(reddit_mentions)
-    except Exception as e:
-        logger.error(f"Reddit failed: {e}")
+    # Collect from all sources at once; one overall deadline bounds the
+    # whole briefing so a slow source is dropped rather than waited on.
+    deadline = time.monotonic() + settings.NEWS_FETCH_DEADLINE
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="news")
+    futures = {
+        "Google News": executor.submit(scrape_google_news, company_name, deadline),
+        "Yahoo Finance": executor.submit(scrape_yahoo_finance_news, ticker),
+        "Reddit": executor.submit(scrape_reddit_mentions, company_name, deadline),
+    }
+    wait(futures.values(), timeout=max(0, deadline - time.monotonic()))
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for source_name, future in futures.items():
+        if not future.done():
+            logger.error(f"{source_name} missed the {settings.NEWS_FETCH_DEADLINE}s fetch deadline")
+        elif future.exception():
+            logger.error(f"{source_name} failed: {future.exception()}")
+        else:
+            all_sources.extend(future.result())
 
     logger.info(f"Total items collected from all sources: {len(all_sources)}")
-    
+    logger.info(f"HTTP pool stats: {get_pool_stats()}")
+    return all_sources
+
+def headline_titles(all_sources: List[Dict[str, Any]]) -> List[str]:
+    """The titles sent to the sentiment model for these articles, in order"""
+    return [item['title'] for item in all_sources if item.get('title')]
+
+def build_intelligence_briefing(all_sources: List[Dict[str, Any]],
+                                results: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Scores the articles and summarizes their sentiment. `results` are
+    precomputed classify_titles() scores for headline_titles(all_sources),
+    e.g. from one batch call shared by many tickers.
+    """
     if not all_sources:
         return {
             "articles": [], 
@@ -219,8 +340,9 @@ def get_combined_news_and_sentiment(ticker: str, company_name: str) -> Dict[str,
     
     # Perform sentiment analysis
     try:
-        titles = [item['title'] for item in all_sources if item.get('title')]
-        results = sentiment_pipeline(titles, truncation=True, max_length=512)
+        if results is None:
+            results = classify_titles(headline_titles(all_sources))
+            logger.info(f"Sentiment cache stats: {get_sentiment_cache_stats()}, batcher stats: {get_batcher_stats()}")
 
         # Map sentiment results back to articles
         for i, item in enumerate(all_sources):
@@ -274,4 +396,8 @@ def get_combined_news_and_sentiment(ticker: str, company_name: str) -> Dict[str,
     }
     
     logger.info(f"News analysis completed: {len(all_sources)} articles, {counts}")
-    return result
\ No newline at end of file
+    return result
+
+def get_combined_news_and_sentiment(ticker: str, company_name: str) -> Dict[str, Any]:
+    """Main function that combines all news sources and analyzes sentiment"""
+    return build_intelligence_briefing(collect_news(ticker, company_name))
@@ -0,0 +1,224 @@
+import yfinance as yf
+import numpy as np
+import pandas as pd
+from core.config import settings
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Dict, Any, Optional
+import fcntl
+import json
+import os
+import re
+
+# One fixed-width record per daily bar. Each ticker is a flat file of these
+# records, read through np.memmap so slices are views of the page cache.
+RECORD_DTYPE = np.dtype([
+    ('date', '<M8[D]'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+COLUMNS = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'}
+
+# Relative difference in a settled close that counts as a re-adjustment
+ADJUSTMENT_TOLERANCE = 1e-4
+
+PERIOD_DAYS = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}
+
+def period_start(period: str, today: Optional[date] = None) -> np.datetime64:
+    """First calendar day covered by a yfinance-style period such as '100d' or '2y'."""
+    if period == 'max':
+        return np.datetime64('1970-01-01', 'D')
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period '{period}'")
+    today = today or date.today()
+    days = int(match.group(1)) * PERIOD_DAYS[match.group(2)]
+    return np.datetime64(today - timedelta(days=days), 'D')
+
+def _paths(ticker: str):
+    base = os.path.join(settings.OHLCV_STORE_DIR, ticker.replace('/', '_'))
+    return base + '.ohlcv', base + '.json', base + '.lock'
+
+@contextmanager
+def _writer_lock(lock_path: str):
+    # Serializes writers across worker processes; readers never take it
+    with open(lock_path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _read_meta(meta_path: str) -> Dict[str, Any]:
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_meta(meta_path: str, meta: Dict[str, Any]):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+def frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    records = np.empty(len(df), dtype=RECORD_DTYPE)
+    records['date'] = df.index.values.astype('datetime64[D]')
+    for column, field in COLUMNS.items():
+        records[field] = df[column].to_numpy(dtype='f8')
+    return records
+
+def load_bars(ticker: str) -> np.ndarray:
+    """All stored bars for `ticker` as a read-only memory-mapped record array."""
+    data_path, _, _ = _paths(ticker)
+    try:
+        count = os.path.getsize(data_path) // RECORD_DTYPE.itemsize
+    except OSError:
+        count = 0
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(data_path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+def read_bars(ticker: str, start: np.datetime64) -> np.ndarray:
+    """Bars on or after `start`. The result is a view, not a copy."""
+    bars = load_bars(ticker)
+    return bars[np.searchsorted(bars['date'], start):]
+
+def bars_to_frame(bars: np.ndarray) -> pd.DataFrame:
+    """
+    Copies bars into the yf.download-style frame pandas callers expect.
+    Array callers should use read_bars directly and skip the copy.
+    """
+    if len(bars) == 0:
+        return pd.DataFrame()
+    index = pd.DatetimeIndex(bars['date'].astype('datetime64[ns]'), name='Date')
+    return pd.DataFrame({column: bars[field] for column, field in COLUMNS.items()}, index=index)
+
+def _drop_missing(records: np.ndarray) -> np.ndarray:
+    # yfinance pads sessions a ticker didn't trade (in multi-ticker downloads,
+    # every other ticker's sessions) with NaN rows. Both writers skip bars
+    # without a close, so the store never holds them.
+    return records[~np.isnan(records['close'])]
+
+def _write_records(data_path: str, bars: np.ndarray, records: np.ndarray):
+    # Caller holds the writer lock. Stored bars before the first new date are
+    # kept and the records replace everything from that date on. The merged
+    # file atomically replaces the old one, so readers holding a memmap keep
+    # a consistent snapshot.
+    kept = bars[:np.searchsorted(bars['date'], records['date'][0])]
+    tmp_path = data_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(kept.tobytes())
+        f.write(records.tobytes())
+    os.replace(tmp_path, data_path)
+
+def _covers(bars: np.ndarray, meta: Dict[str, Any], start: np.datetime64) -> bool:
+    backfill_start = meta.get('backfill_start')
+    return len(bars) > 0 and backfill_start is not None and start >= np.datetime64(backfill_start, 'D')
+
+def _top_up_start(bars: np.ndarray) -> np.datetime64:
+    # The last stored bar may have been a partial intraday bar; the settled
+    # one before it shows whether the history has been re-adjusted since
+    return bars['date'][-min(len(bars), 2)]
+
+def sync_start(ticker: str, start: np.datetime64) -> np.datetime64:
+    """
+    First date a sync of `ticker` back to `start` downloads: `start` itself
+    when the store doesn't cover it yet, otherwise the last two stored bars.
+    """
+    _, meta_path, _ = _paths(ticker)
+    bars = load_bars(ticker)
+    return _top_up_start(bars) if _covers(bars, _read_meta(meta_path), start) else start
+
+def store_covers(ticker: str, start: np.datetime64) -> bool:
+    """True when the store holds bars for `ticker` back to `start`."""
+    _, meta_path, _ = _paths(ticker)
+    return _covers(load_bars(ticker), _read_meta(meta_path), start)
+
+def _download(ticker: str, start: np.datetime64) -> np.ndarray:
+    df = yf.download(ticker, start=str(start), interval='1d', progress=False)
+    if df.empty:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    records = _drop_missing(frame_to_records(df))
+    return records[records['date'] >= start]
+
+def _readjusted(bars: np.ndarray, records: np.ndarray) -> bool:
+    # Yahoo's bars are split- and dividend-adjusted, so a corporate action
+    # re-prices the whole history. A settled bar (any but the last stored one,
+    # which may have been partial) coming back at a different close means the
+    # stored bars are on the old price basis.
+    settled = bars[:-1]
+    _, stored, fetched = np.intersect1d(settled['date'], records['date'], return_indices=True)
+    return not np.allclose(settled['close'][stored], records['close'][fetched], rtol=ADJUSTMENT_TOLERANCE, atol=0)
+
+def sync_ticker(ticker: str, start: np.datetime64) -> int:
+    """
+    Brings the store for `ticker` up to date and returns the number of bars
+    fetched. Normally only the last two stored bars and anything newer are
+    downloaded and merged in: the last may have been a partial intraday bar,
+    and the settled one before it shows whether Yahoo has re-adjusted the
+    history since, in which case the whole stored range is downloaded again.
+    """
+    data_path, meta_path, lock_path = _paths(ticker)
+    os.makedirs(settings.OHLCV_STORE_DIR, exist_ok=True)
+
+    with _writer_lock(lock_path):
+        meta = _read_meta(meta_path)
+        bars = load_bars(ticker)
+        # Empty store, or a longer range than we've ever fetched: rebuild
+        rebuild = not _covers(bars, meta, start)
+        fetch_start = start if rebuild else _top_up_start(bars)
+        records = _download(ticker, fetch_start)
+        if not rebuild and _readjusted(bars, records):
+            rebuild, fetch_start = True, np.datetime64(meta['backfill_start'], 'D')
+            records = _download(ticker, fetch_start)
+        if len(records) == 0:
+            return 0
+        _write_records(data_path, bars[:0] if rebuild else bars, records)
+
+        if rebuild:
+            meta['backfill_start'] = str(fetch_start)
+        _write_meta(meta_path, meta)
+        return len(records)
+
+def store_bars(ticker: str, records: np.ndarray, start: np.datetime64,
+               fetched_from: Optional[np.datetime64] = None) -> int:
+    """
+    Merges bars downloaded elsewhere (e.g. one multi-ticker yf.download) that
+    cover every trading day from `fetched_from` (default `start`) to today,
+    keeping the store covering `start`. Returns the bars written: 0 when these
+    bars can't bring the store up to date, which sync_ticker then does.
+    """
+    data_path, meta_path, lock_path = _paths(ticker)
+    os.makedirs(settings.OHLCV_STORE_DIR, exist_ok=True)
+    fetched_from = start if fetched_from is None else fetched_from
+    records = _drop_missing(records)
+    records = records[records['date'] >= fetched_from]
+    if len(records) == 0:
+        return 0
+
+    with _writer_lock(lock_path):
+        meta = _read_meta(meta_path)
+        bars = load_bars(ticker)
+        # Merging after a stale store would leave a gap, and keeping bars from
+        # before a re-adjustment would mix price bases: rebuild then, if the
+        # records reach back far enough
+        merge = (_covers(bars, meta, start) and fetched_from <= bars['date'][-1]
+                 and not _readjusted(bars, records))
+        if not merge:
+            records = records[records['date'] >= start]
+            if fetched_from > start or len(records) == 0:
+                return 0
+        _write_records(data_path, bars if merge else bars[:0], records)
+
+        if not merge:
+            meta['backfill_start'] = str(start)
+        _write_meta(meta_path, meta)
+        return len(records)
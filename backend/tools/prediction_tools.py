@@ -1,38 +1,117 @@
-import yfinance as yf
 from prophet import Prophet
+from core.cache import TieredCache, get_redis
+from core.config import settings
+from tools import forecast_engine
+from tools.market_data_tools import get_price_history
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import logging
+import redis
+import time
 
-def generate_forecast(ticker: str) -> Dict[str, Any]:
-    print(f"Generating forecast for ticker {ticker}...")
-    
-    stock_data = yf.download(ticker, period="2y", progress=False)
-    
-    if stock_data.empty:
-        return {"error": f"Could not download historical data for {ticker}."}
+logger = logging.getLogger(__name__)
+
+FORECAST_ENGINES = ("prophet", "numpy")
+FORECAST_PERIODS = 30
+
+# --- Fitted-model cache ---
+# One entry per (engine, ticker): the forecast, the fitted parameters used to
+# warm-start the next refit, and the watermark of the data it was trained on.
+_forecast_cache = TieredCache("forecast", 200, settings.FORECAST_CACHE_TTL)
+FORECAST_STATS_KEY = "forecast:stats"
 
+def _record_stats(**amounts: float):
+    # Shared across workers: hits, misses, warm_starts, fit_seconds, fit_seconds_saved
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for name, amount in amounts.items():
+            pipe.hincrbyfloat(FORECAST_STATS_KEY, name, amount)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record forecast cache stats: {e}")
+
+def get_forecast_cache_stats() -> Dict[str, Any]:
+    try:
+        raw = get_redis().hgetall(FORECAST_STATS_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read forecast cache stats: {e}")
+        raw = {}
+    stats = {key.decode(): round(float(value), 3) for key, value in raw.items()}
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+    stats["hit_rate"] = round(stats.get("hits", 0) / lookups, 3) if lookups else 0.0
+    return stats
+
+def training_watermark(df_prophet: pd.DataFrame) -> str:
+    """Last bar's date and close: changes with every new bar and every revision of the latest one."""
+    last = df_prophet.iloc[-1]
+    return f"{last['ds'].date().isoformat()}:{last['y']:.4f}"
+
+def _forecast_to_json(forecast: pd.DataFrame) -> Dict[str, Any]:
+    return {
+        "ds": [ts.isoformat() for ts in forecast['ds']],
+        **{column: forecast[column].tolist() for column in ('yhat', 'yhat_lower', 'yhat_upper')},
+    }
+
+def _forecast_from_json(payload: Dict[str, Any]) -> pd.DataFrame:
+    return pd.DataFrame({**payload, 'ds': pd.to_datetime(payload['ds'])})
+
+def history_frame(ticker: str) -> pd.DataFrame:
+    stock_data = get_price_history(ticker, period="2y")
+    if stock_data.empty:
+        return stock_data
     df_prophet = stock_data[['Close']].copy()
     df_prophet.reset_index(inplace=True)
-    # 3. Rename the columns to what Prophet expects.
+    # Rename the columns to what Prophet expects.
     df_prophet.columns = ['ds', 'y']
+    return df_prophet.dropna()
 
+def fit_prophet(df_prophet: pd.DataFrame, init: Optional[Dict[str, Any]] = None) -> Prophet:
+    """Fits Prophet, warm-starting the optimizer from `init` (see prophet_state) when given."""
     model = Prophet(
         daily_seasonality=False,
         weekly_seasonality=True,
         yearly_seasonality=True,
         changepoint_prior_scale=0.05
     )
-    model.fit(df_prophet)
+    # Prophet validates a custom init against the model's shapes and falls back to its own
+    model.fit(df_prophet, **({"init": init} if init else {}))
+    return model
+
+def prophet_state(model: Prophet) -> Dict[str, Any]:
+    """The fitted parameters in the shape Prophet.fit(init=...) accepts, as plain lists."""
+    state = {name: float(model.params[name][0][0]) for name in ('k', 'm', 'sigma_obs')}
+    state.update({name: model.params[name][0].tolist() for name in ('delta', 'beta')})
+    return state
+
+def predict_prophet(model: Prophet) -> pd.DataFrame:
+    future = model.make_future_dataframe(periods=FORECAST_PERIODS)
+    return model.predict(future)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
+def prophet_forecast(df_prophet: pd.DataFrame) -> pd.DataFrame:
+    return predict_prophet(fit_prophet(df_prophet))
+
+def numpy_forecasts(frames: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """Prophet-shaped forecast frames for many histories, fitted in one batch."""
+    dates = [frame['ds'].to_numpy(dtype='datetime64[D]') for frame in frames]
+    params = forecast_engine.fit_batch(dates, [frame['y'].to_numpy(dtype='f8') for frame in frames],
+                                       changepoint_prior_scale=0.05)
+    forecasts = []
+    for history_dates, series_params in zip(dates, params):
+        ds = forecast_engine.forecast_dates(history_dates, FORECAST_PERIODS)
+        yhat, yhat_lower, yhat_upper = forecast_engine.predict(series_params, ds)
+        forecasts.append(pd.DataFrame({
+            'ds': pd.to_datetime(ds), 'yhat': yhat, 'yhat_lower': yhat_lower, 'yhat_upper': yhat_upper,
+        }))
+    return forecasts
 
-    future = model.make_future_dataframe(periods=30)
-    forecast = model.predict(future)
-    
+def build_forecast_result(df_prophet: pd.DataFrame, forecast: pd.DataFrame, engine: str) -> Dict[str, Any]:
     current_price = df_prophet['y'].iloc[-1]
     predicted_price_30_days = forecast['yhat'].iloc[-1]
     trend = "upward" if predicted_price_30_days > current_price else "downward"
     change_percent = ((predicted_price_30_days - current_price) / current_price) * 100
 
-    forecast_data = {
+    return {
+        "engine": engine,
         "summary": (
             f"The model predicts a {trend} trend over the next 30 days. "
             f"Current price: {current_price:.2f}, "
@@ -52,6 +131,94 @@ def generate_forecast(ticker: str) -> Dict[str, Any]:
             } for r in forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(120).to_dict('records')
         ]
     }
-    
+
+def _cached_forecast(key: str, watermark: str) -> Optional[pd.DataFrame]:
+    entry = _forecast_cache.get(key)
+    if entry is None or entry["watermark"] != watermark:
+        return None
+    _record_stats(hits=1, fit_seconds_saved=entry["fit_seconds"])
+    return _forecast_from_json(entry["forecast"])
+
+def _store_forecast(key: str, watermark: str, forecast: pd.DataFrame, fit_seconds: float,
+                    state: Optional[Dict[str, Any]] = None):
+    _forecast_cache.set(key, {
+        "watermark": watermark,
+        "fit_seconds": fit_seconds,
+        "state": state,
+        "forecast": _forecast_to_json(forecast),
+    })
+
+def generate_forecast(ticker: str, engine: Optional[str] = None) -> Dict[str, Any]:
+    engine = engine or settings.FORECAST_ENGINE
+    if engine not in FORECAST_ENGINES:
+        return {"error": f"Unknown forecast engine '{engine}'."}
+    print(f"Generating forecast for ticker {ticker} with the {engine} engine...")
+
+    df_prophet = history_frame(ticker)
+    if df_prophet.empty:
+        return {"error": f"Could not download historical data for {ticker}."}
+
+    # No new bars since the last fit: serve the cached model's forecast
+    key, watermark = f"{engine}:{ticker}", training_watermark(df_prophet)
+    forecast = _cached_forecast(key, watermark)
+    if forecast is not None:
+        print(f"Forecast for {ticker} served from the cached {engine} model.")
+        return build_forecast_result(df_prophet, forecast, engine)
+
+    if engine == "numpy" and len(df_prophet) < forecast_engine.MIN_OBSERVATIONS:
+        return {"error": f"Not enough historical data for {ticker}."}
+
+    started = time.perf_counter()
+    if engine == "numpy":
+        # A closed-form fit has nothing to warm-start
+        forecast, state, previous = numpy_forecasts([df_prophet])[0], None, None
+    else:
+        previous = _forecast_cache.get(key)
+        model = fit_prophet(df_prophet, init=previous and previous["state"])
+        forecast, state = predict_prophet(model), prophet_state(model)
+    fit_seconds = time.perf_counter() - started
+
+    if previous and previous["state"]:
+        _record_stats(misses=1, warm_starts=1, fit_seconds=fit_seconds,
+                      fit_seconds_saved=max(0.0, previous["fit_seconds"] - fit_seconds))
+        # Keep the cold-fit time as the baseline for later savings
+        fit_seconds = max(fit_seconds, previous["fit_seconds"])
+    else:
+        _record_stats(misses=1, fit_seconds=fit_seconds)
+    _store_forecast(key, watermark, forecast, fit_seconds, state)
+
     print(f"Forecast for {ticker} generated successfully.")
-    return forecast_data
\ No newline at end of file
+    logger.info(f"Forecast cache stats: {get_forecast_cache_stats()}")
+    return build_forecast_result(df_prophet, forecast, engine)
+
+def generate_forecasts(tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Forecasts for many tickers with the numpy engine. Cached models are
+    reused; the rest are fitted together in one batch.
+    """
+    frames = {ticker: history_frame(ticker) for ticker in tickers}
+    # Too-short histories would fail the whole batch solve
+    results = {
+        t: {"error": f"Not enough historical data for {t}."}
+        for t, f in frames.items() if len(f) < forecast_engine.MIN_OBSERVATIONS
+    }
+
+    to_fit = []
+    for ticker, frame in frames.items():
+        if ticker in results:
+            continue
+        forecast = _cached_forecast(f"numpy:{ticker}", training_watermark(frame))
+        if forecast is None:
+            to_fit.append(ticker)
+        else:
+            results[ticker] = build_forecast_result(frame, forecast, "numpy")
+
+    if to_fit:
+        started = time.perf_counter()
+        forecasts = numpy_forecasts([frames[t] for t in to_fit])
+        fit_seconds = time.perf_counter() - started
+        _record_stats(misses=len(to_fit), fit_seconds=fit_seconds)
+        for ticker, forecast in zip(to_fit, forecasts):
+            _store_forecast(f"numpy:{ticker}", training_watermark(frames[ticker]), forecast, fit_seconds / len(to_fit))
+            results[ticker] = build_forecast_result(frames[ticker], forecast, "numpy")
+    return results
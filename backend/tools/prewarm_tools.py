@@ -0,0 +1,52 @@
+from core.cache import get_redis
+from tools.analyst_tools import HISTORY_PERIOD
+from tools.market_data_tools import is_history_stored, yahoo_symbol
+from tools.news_tools import is_news_cached
+from typing import Dict, Any, Mapping
+import logging
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Counters shared by every worker: how many user jobs started warm or cold,
+# plus a summary of the latest prewarm run (fields prefixed "last_run_").
+STATS_KEY = "prewarm:stats"
+
+def is_ticker_warm(ticker: str) -> bool:
+    """
+    Whether a job for `ticker` would start with what the prewarm keeps warm:
+    news (scored for sentiment in the same run) and the stored daily bars.
+    Ticker info isn't counted: it lives MARKET_DATA_INFO_TTL seconds while
+    the market trades, far less than PREWARM_INTERVAL_MINUTES.
+    """
+    return is_news_cached(ticker) and is_history_stored(yahoo_symbol(ticker), HISTORY_PERIOD)
+
+def record_job_warmth(ticker: str) -> bool:
+    warm = is_ticker_warm(ticker)
+    try:
+        get_redis().hincrby(STATS_KEY, "jobs_warm" if warm else "jobs_cold", 1)
+    except redis.RedisError as e:
+        logger.warning(f"Could not record prewarm stats: {e}")
+    return warm
+
+def record_prewarm_run(run_stats: Dict[str, Any]):
+    try:
+        get_redis().hset(STATS_KEY, mapping={f"last_run_{k}": v for k, v in run_stats.items()})
+    except redis.RedisError as e:
+        logger.warning(f"Could not record prewarm stats: {e}")
+
+def summarize_prewarm_stats(raw: Mapping) -> Dict[str, Any]:
+    """Decodes the STATS_KEY hash and adds the share of jobs that started warm."""
+    stats = {}
+    for key, value in raw.items():
+        key = key.decode() if isinstance(key, bytes) else key
+        value = value.decode() if isinstance(value, bytes) else value
+        try:
+            stats[key] = float(value) if "." in value else int(value)
+        except ValueError:
+            stats[key] = value
+    stats.setdefault("jobs_warm", 0)
+    stats.setdefault("jobs_cold", 0)
+    total = stats["jobs_warm"] + stats["jobs_cold"]
+    stats["warm_rate"] = round(stats["jobs_warm"] / total, 3) if total else 0.0
+    return stats
@@ -0,0 +1,129 @@
+import numpy as np
+from typing import Any, Dict, Optional
+
+# Compact technical summary of daily bars for the LLM prompt. A printed
+# OHLCV table spends most of its tokens on padding and digits the model
+# can't use; these few derived numbers carry the same signal.
+TRADING_DAYS = 252
+RETURN_HORIZONS = {"1d": 1, "1w": 5, "1m": 21, "3m": 63, "1y": 252}
+VOLATILITY_WINDOWS = (21, 63)
+MA_WINDOWS = (20, 50, 200)
+ATR_WINDOW = 14
+VOLUME_WINDOW = 20
+RECENT_CLOSES = 5
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """Trailing means of every full window; the result has len(x) - window + 1 entries."""
+    sums = np.cumsum(np.concatenate([[0.0], x]))
+    return (sums[window:] - sums[:-window]) / window
+
+def _last_cross(fast: np.ndarray, slow: np.ndarray) -> Optional[Dict[str, Any]]:
+    # fast and slow end on the same bar; compare them over their common tail
+    n = min(len(fast), len(slow))
+    if n < 2:
+        return None
+    above = fast[-n:] > slow[-n:]
+    flips = np.flatnonzero(above[1:] != above[:-1])
+    return {
+        "above": bool(above[-1]),
+        # Sessions since the last crossover, or None if there was none in view
+        "sessions": int(n - 1 - flips[-1]) if len(flips) else None,
+    }
+
+def compute_features(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                     volume: np.ndarray) -> Dict[str, Any]:
+    """
+    Returns, volatility, ATR, moving averages and their crossovers, volume
+    z-scores and the 52-week position from daily bars (oldest first). Measures
+    whose lookback is longer than the history are left out.
+    """
+    high, low, close, volume = (np.asarray(a, dtype='f8') for a in (high, low, close, volume))
+    n = len(close)
+    last = close[-1]
+    features: Dict[str, Any] = {"sessions": n, "close": last, "recent_closes": close[-RECENT_CLOSES:]}
+
+    features["returns"] = {
+        name: 100 * (last / close[-1 - lag] - 1) for name, lag in RETURN_HORIZONS.items() if lag < n
+    }
+
+    log_returns = np.diff(np.log(close))
+    features["volatility"] = {
+        f"{w}d": 100 * np.sqrt(TRADING_DAYS) * log_returns[-w:].std(ddof=1)
+        for w in VOLATILITY_WINDOWS if w <= len(log_returns)
+    }
+
+    if n > ATR_WINDOW:
+        true_range = np.maximum(high[1:], close[:-1]) - np.minimum(low[1:], close[:-1])
+        features["atr"] = true_range[-ATR_WINDOW:].mean()
+
+    averages = {w: rolling_mean(close, w) for w in MA_WINDOWS if w <= n}
+    features["moving_averages"] = {w: ma[-1] for w, ma in averages.items()}
+    features["crossovers"] = {
+        (fast, slow): _last_cross(averages[fast], averages[slow])
+        for fast, slow in ((20, 50), (50, 200)) if fast in averages and slow in averages
+    }
+
+    if n > VOLUME_WINDOW:
+        # Today's volume against the preceding window, and the last week's mean against the same
+        baseline = volume[-1 - VOLUME_WINDOW:-1]
+        std = baseline.std(ddof=1)
+        if std > 0:
+            features["volume"] = {
+                "last": volume[-1],
+                "z": (volume[-1] - baseline.mean()) / std,
+                "z_5d": (volume[-5:].mean() - baseline.mean()) / std,
+            }
+
+    year_high, year_low = high[-TRADING_DAYS:].max(), low[-TRADING_DAYS:].min()
+    features["range"] = {
+        "high": year_high,
+        "low": year_low,
+        "position": 100 * (last - year_low) / (year_high - year_low) if year_high > year_low else 50.0,
+        "below_high": 100 * (1 - last / year_high),
+        "sessions": min(n, TRADING_DAYS),
+    }
+    return features
+
+def _volume_text(volume: float) -> str:
+    for divisor, suffix in ((1e7, "Cr"), (1e5, "L")):
+        if volume >= divisor:
+            return f"{volume / divisor:.2f}{suffix}"
+    return f"{volume:.0f}"
+
+def format_features(ticker: str, as_of: str, features: Dict[str, Any]) -> str:
+    """A few short lines for the prompt, in rupees and percent."""
+    lines = [f"{ticker} daily technicals as of {as_of} ({features['sessions']} sessions)"]
+    returns = ", ".join(f"{name} {value:+.1f}%" for name, value in features["returns"].items())
+    lines.append(f"Close ₹{features['close']:.2f}" + (f"; returns: {returns}" if returns else ""))
+
+    risk = [f"{name} {value:.1f}%" for name, value in features["volatility"].items()]
+    line = f"Annualized volatility: {', '.join(risk)}" if risk else ""
+    if "atr" in features:
+        line += f"{'; ' if line else ''}ATR{ATR_WINDOW} ₹{features['atr']:.2f} ({100 * features['atr'] / features['close']:.1f}% of close)"
+    if line:
+        lines.append(line)
+
+    if features["moving_averages"]:
+        averages = ", ".join(
+            f"SMA{w} ₹{ma:.2f} ({100 * (features['close'] / ma - 1):+.1f}%)"
+            for w, ma in features["moving_averages"].items()
+        )
+        lines.append(f"Price vs {averages}")
+    for (fast, slow), cross in features["crossovers"].items():
+        if cross is None:
+            continue
+        state = f"SMA{fast} {'above' if cross['above'] else 'below'} SMA{slow}"
+        since = f" since a cross {cross['sessions']} sessions ago" if cross["sessions"] is not None else ""
+        lines.append(f"{state}{since}")
+
+    if "volume" in features:
+        v = features["volume"]
+        lines.append(f"Volume {_volume_text(v['last'])}, z {v['z']:+.1f} vs {VOLUME_WINDOW}d (5d avg z {v['z_5d']:+.1f})")
+
+    r = features["range"]
+    lines.append(
+        f"{r['sessions']}-session range ₹{r['low']:.2f}-₹{r['high']:.2f}: at {r['position']:.0f}% of range, "
+        f"{r['below_high']:.1f}% below high"
+    )
+    lines.append("Last closes: " + ", ".join(f"{c:.2f}" for c in features["recent_closes"]))
+    return "\n".join(lines)
@@ -0,0 +1,343 @@
+from transformers import pipeline, AutoConfig, AutoTokenizer
+from concurrent.futures import Future
+from core.config import settings
+from core.cache import TieredCache
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# --- Model Loading ---
+sentiment_pipeline = None
+# What actually loaded, as "<model>:<backend>"; None for the neutral stand-in
+_loaded_model_id: Optional[str] = None
+MODEL_PATH = settings.SENTIMENT_MODEL_PATH
+_sentiment_pipeline_lock = threading.Lock()
+
+# --- ONNX Runtime backend ---
+ONNX_MODEL_FILE = "model.int8.onnx"
+
+def export_onnx_model(model_path: str = MODEL_PATH, output_dir: Optional[str] = None) -> str:
+    """
+    Exports the classifier to ONNX and applies dynamic INT8 quantization to its
+    weights. Reuses an earlier export when one exists. Returns the model file path.
+    """
+    output_dir = output_dir or settings.SENTIMENT_ONNX_DIR
+    quantized_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    if os.path.exists(quantized_path):
+        return quantized_path
+
+    import torch
+    from transformers import AutoModelForSequenceClassification
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(output_dir, exist_ok=True)
+    logger.info(f"Exporting {model_path} to ONNX in {output_dir}...")
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    sample = tokenizer(["Reliance shares rise after strong quarterly results"], return_tensors="pt")
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names} | {"logits": {0: "batch"}},
+            opset_version=14,
+        )
+    quantize_dynamic(fp32_path, quantized_path, weight_type=QuantType.QInt8)
+    logger.info(f"Quantized ONNX model written to {quantized_path}")
+    return quantized_path
+
+class OnnxSentimentClassifier:
+    """
+    INT8 ONNX Runtime classifier with the same call signature and output format
+    as the transformers text-classification pipeline.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, onnx_path: Optional[str] = None):
+        import onnxruntime  # noqa: F401  fail here (and fall back) if it isn't installed
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.id2label = AutoConfig.from_pretrained(model_path).id2label
+        self.onnx_path = onnx_path or export_onnx_model(model_path)
+        self._session = None
+        self._session_pid = None
+
+    def _get_session(self):
+        # ONNX Runtime's thread pool doesn't survive fork, so each process
+        # (e.g. every prefork child) opens its own session on first use.
+        if self._session is None or self._session_pid != os.getpid():
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if settings.SENTIMENT_ONNX_THREADS:
+                options.intra_op_num_threads = settings.SENTIMENT_ONNX_THREADS
+            self._session = ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+            self._session_pid = os.getpid()
+        return self._session
+
+    def __call__(self, texts: List[str], truncation: bool = True, max_length: int = 512, batch_size: int = 32, **kwargs) -> List[Dict[str, Any]]:
+        import numpy as np
+
+        session = self._get_session()
+        input_names = [i.name for i in session.get_inputs()]
+        results = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=truncation,
+                                     max_length=max_length, return_tensors="np")
+            logits = session.run(None, {name: encoded[name].astype(np.int64) for name in input_names})[0]
+            # Softmax, shifted for numerical stability
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+            for row in probs:
+                label_id = int(row.argmax())
+                results.append({'label': self.id2label[label_id], 'score': float(row[label_id])})
+        return results
+
+def load_sentiment_pipeline():
+    """
+    Loads the sentiment model once per process. Celery workers call this from
+    worker_init (see celery_worker.py) so forked children inherit a warm model;
+    anywhere else it loads lazily on first use.
+    """
+    global sentiment_pipeline, _loaded_model_id
+    with _sentiment_pipeline_lock:
+        if sentiment_pipeline is not None:
+            return
+        if settings.SENTIMENT_BACKEND == "onnx":
+            try:
+                sentiment_pipeline = OnnxSentimentClassifier(MODEL_PATH)
+                _loaded_model_id = f"{MODEL_PATH}:onnx"
+                logger.info("ONNX Runtime sentiment classifier loaded.")
+                return
+            except Exception as e:
+                logger.warning(f"Could not load ONNX backend ({e}), falling back to PyTorch...")
+        logger.info("Loading sentiment analysis pipeline...")
+        try:
+            # Try to load the custom model
+            sentiment_pipeline = pipeline('text-classification', model=MODEL_PATH, tokenizer=MODEL_PATH)
+            _loaded_model_id = f"{MODEL_PATH}:pytorch"
+            logger.info("Custom sentiment pipeline loaded.")
+        except Exception as e:
+            logger.warning(f"Could not load custom model ({e}), using default pipeline...")
+            try:
+                # Fallback to default sentiment analysis
+                sentiment_pipeline = pipeline('sentiment-analysis')
+                _loaded_model_id = f"{sentiment_pipeline.model.name_or_path}:pytorch"
+                logger.info("Default sentiment pipeline loaded.")
+            except Exception as e2:
+                logger.error(f"Could not load any sentiment pipeline: {e2}")
+                # Create a dummy pipeline that always returns neutral
+                sentiment_pipeline = lambda texts, **kwargs: [{'label': 'NEUTRAL', 'score': 0.5} for _ in texts]
+
+def is_sentiment_pipeline_ready() -> bool:
+    return sentiment_pipeline is not None
+
+def loaded_model_id() -> Optional[str]:
+    """The model this process scores with, loading it if needed; None if only the neutral stand-in loaded."""
+    load_sentiment_pipeline()
+    return _loaded_model_id
+
+def run_sentiment_model(titles: List[str]) -> List[Dict[str, Any]]:
+    """One forward pass over `titles`, batched inside the transformers pipeline."""
+    load_sentiment_pipeline()
+    return sentiment_pipeline(titles, truncation=True, max_length=512, batch_size=settings.SENTIMENT_MODEL_BATCH_SIZE)
+
+# --- Dynamic micro-batching ---
+class _BatchRequest:
+    def __init__(self, titles: List[str]):
+        self.titles = titles
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+class SentimentBatcher:
+    """
+    In-process inference server. Callers from any thread submit their titles;
+    a single background thread merges whatever is queued into one batch (up to
+    max_batch_size titles, waiting at most max_wait_ms for more to arrive),
+    runs the model once and hands each caller back its own slice.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: "queue.Queue[_BatchRequest]" = queue.Queue()
+        self.stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+        self.queue_wait_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.last_batch_size = 0
+        self.thread = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, titles: List[str]) -> Future:
+        request = _BatchRequest(titles)
+        self.queue.put(request)
+        return request.future
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            size = len(batch[0].titles)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.titles)
+            self._process(batch)
+
+    def _process(self, batch: List[_BatchRequest]):
+        started = time.monotonic()
+        titles = [title for request in batch for title in request.titles]
+        try:
+            results = run_sentiment_model(titles)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        finished = time.monotonic()
+
+        offset = 0
+        for request in batch:
+            request.future.set_result(results[offset:offset + len(request.titles)])
+            offset += len(request.titles)
+
+        with self.stats_lock:
+            self.batches += 1
+            self.items += len(titles)
+            self.requests += len(batch)
+            self.queue_wait_seconds += sum(started - request.enqueued_at for request in batch)
+            self.inference_seconds += finished - started
+            self.last_batch_size = len(titles)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "requests": self.requests,
+                "last_batch_size": self.last_batch_size,
+                "avg_batch_size": round(self.items / self.batches, 1) if self.batches else 0.0,
+                "avg_queue_wait_ms": round(1000 * self.queue_wait_seconds / self.requests, 1) if self.requests else 0.0,
+                "titles_per_second": round(self.items / self.inference_seconds, 1) if self.inference_seconds else 0.0,
+            }
+
+_batcher: Optional[SentimentBatcher] = None
+_batcher_pid: Optional[int] = None
+_batcher_lock = threading.Lock()
+
+def get_sentiment_batcher() -> SentimentBatcher:
+    """Returns this process's batcher. Threads don't survive fork, so each child starts its own."""
+    global _batcher, _batcher_pid
+    with _batcher_lock:
+        if _batcher is None or _batcher_pid != os.getpid():
+            _batcher = SentimentBatcher(settings.SENTIMENT_MAX_BATCH_SIZE, settings.SENTIMENT_MAX_WAIT_MS)
+            _batcher_pid = os.getpid()
+        return _batcher
+
+def get_batcher_stats() -> Dict[str, Any]:
+    return _batcher.stats() if _batcher is not None and _batcher_pid == os.getpid() else {}
+
+# --- Result cache ---
+# Scores are keyed by the normalized title plus the model/backend that produced
+# them, so switching models (or PyTorch <-> ONNX, or falling back to the default
+# pipeline) never serves stale labels. The neutral stand-in's scores are never cached.
+_sentiment_cache = TieredCache("sentiment", settings.SENTIMENT_CACHE_SIZE, settings.SENTIMENT_CACHE_TTL)
+
+def sentiment_model_id() -> Optional[str]:
+    """
+    The model whose scores this process caches: the one it loaded, or on io
+    workers (which load none) the configured model the sentiment queue runs.
+    """
+    if settings.WORKER_ROLE == "io":
+        return f"{MODEL_PATH}:{settings.SENTIMENT_BACKEND}"
+    return loaded_model_id()
+
+def sentiment_cache_key(title: str, model_id: str) -> str:
+    # The model is uncased, so case and whitespace don't change its output
+    normalized = " ".join(title.lower().split())
+    return hashlib.sha256(f"{model_id}\n{normalized}".encode("utf-8")).hexdigest()
+
+def get_sentiment_cache_stats() -> Dict[str, Any]:
+    return _sentiment_cache.stats()
+
+def classify_locally(titles: List[str]) -> List[Dict[str, Any]]:
+    """Runs the model in this process, as {'label', 'score'} dicts with plain floats."""
+    if not settings.SENTIMENT_BATCHING_ENABLED:
+        results = run_sentiment_model(titles)
+    else:
+        results = get_sentiment_batcher().submit(titles).result()
+    return [{'label': r['label'], 'score': float(r['score'])} for r in results]
+
+def _classify_on_sentiment_queue(titles: List[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # Inference runs on the sentiment worker; this thread only waits for the
+    # results. Safe to block here because that queue is served by another pool.
+    # Large requests (a whole batch's headlines) go out as several chunks: they
+    # are scored concurrently through the worker's batcher, and each chunk
+    # gets its own timeout instead of one fixed limit for any number of titles.
+    from celery_worker import celery
+
+    size = settings.SENTIMENT_MAX_BATCH_SIZE
+    pending = [
+        celery.send_task("tasks.sentiment_tasks.classify_titles_task", args=[titles[i:i + size]])
+        for i in range(0, len(titles), size)
+    ]
+    results, model_ids = [], set()
+    for result in pending:
+        reply = result.get(timeout=settings.SENTIMENT_REMOTE_TIMEOUT, disable_sync_subtasks=False)
+        results.extend(reply["results"])
+        model_ids.add(reply["model_id"])
+    return results, model_ids.pop() if len(model_ids) == 1 else None
+
+def _classify_uncached(titles: List[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # The scores, and the model that produced them
+    if settings.WORKER_ROLE == "io":
+        return _classify_on_sentiment_queue(titles)
+    results = classify_locally(titles)
+    return results, loaded_model_id()
+
+def classify_titles(titles: List[str]) -> List[Dict[str, Any]]:
+    """
+    Scores headlines, returning one {'label', 'score'} dict per title. Cached
+    scores are reused; only unseen titles go to the model (through the shared
+    batcher when batching is enabled).
+    """
+    if not titles:
+        return []
+    model_id = sentiment_model_id()
+    keys = [sentiment_cache_key(title, model_id) for title in titles]
+    scores = _sentiment_cache.get_many(keys) if model_id else {}
+
+    uncached = {}
+    for key, title in zip(keys, titles):
+        if key not in scores:
+            uncached.setdefault(key, title)
+    if uncached:
+        results, scored_by = _classify_uncached(list(uncached.values()))
+        new_scores = {key: {'label': r['label'], 'score': float(r['score'])} for key, r in zip(uncached, results)}
+        # Only the model the keys name may fill them: not a fallback, nor the neutral stand-in
+        if model_id and scored_by == model_id:
+            _sentiment_cache.set_many(new_scores)
+        scores.update(new_scores)
+
+    return [scores[key] for key in keys]
@@ -5,7 +5,8 @@ import JobStatusCard from './components/JobStatusCard';
 import ResultsDisplay from './components/ResultsDisplay';
 import LoadingSkeleton from './components/LoadingSkeleton';
 import HistoryPanel from './components/HistoryPanel';
-import { createJob, getJob } from './services/api';
+import { createJob, getJob, subscribeToJob } from './services/api';
+import ReactMarkdown from 'react-markdown';
 import { XCircle } from 'lucide-react'; 
 
 function App() {
@@ -13,12 +14,14 @@ function App() {
   const [isLoading, setIsLoading] = useState(false); 
   const [isPolling, setIsPolling] = useState(false); 
   const [error, setError] = useState(null);
+  const [streamingReport, setStreamingReport] = useState('');
 
   const handleAnalysisRequest = async (ticker) => {
     setIsLoading(true);
     setIsPolling(true);
     setError(null);
     setJob(null);
+    setStreamingReport('');
     try {
       const response = await createJob(ticker);
       setJob(response.data);
@@ -39,29 +42,49 @@ function App() {
   useEffect(() => {
     if (!job?.id || !isPolling) return;
 
-    if (job.status !== 'PENDING') {
-      setIsLoading(false);
-    }
+    const isFinished = (status) => status === 'SUCCESS' || status === 'FAILED';
+    let intervalId = null;
 
-    const intervalId = setInterval(async () => {
-      try {
-        const response = await getJob(job.id);
-        const updatedJob = response.data;
-        setJob(updatedJob);
+    // Fallback if the event stream can't be opened or drops: poll as before.
+    const startPolling = () => {
+      intervalId = setInterval(async () => {
+        try {
+          const response = await getJob(job.id);
+          const updatedJob = response.data;
+          setJob(updatedJob);
+          if (updatedJob.status !== 'PENDING') setIsLoading(false);
 
-        if (updatedJob.status === 'SUCCESS' || updatedJob.status === 'FAILED') {
+          if (isFinished(updatedJob.status)) {
+            clearInterval(intervalId);
+            setIsPolling(false);
+          }
+        } catch (err) {
+          setError('Failed to poll job status.');
           clearInterval(intervalId);
           setIsPolling(false);
         }
-      } catch (err) {
-        setError('Failed to poll job status.');
-        clearInterval(intervalId);
-        setIsPolling(false);
-      }
-    }, 3000);
+      }, 3000);
+    };
 
-    return () => clearInterval(intervalId);
-  }, [job, isPolling]);
+    const closeStream = subscribeToJob(
+      job.id,
+      (updatedJob) => {
+        setJob(updatedJob);
+        if (updatedJob.status !== 'PENDING') setIsLoading(false);
+        if (isFinished(updatedJob.status)) {
+          closeStream();
+          setIsPolling(false);
+        }
+      },
+      () => startPolling(),
+      setStreamingReport
+    );
+
+    return () => {
+      closeStream();
+      if (intervalId) clearInterval(intervalId);
+    };
+  }, [job?.id, isPolling]);
 
   return (
     <div className="min-h-screen bg-gray-900 text-white font-sans">
@@ -88,6 +111,12 @@ function App() {
           
           {job && !isLoading && <JobStatusCard job={job} />}
 
+          {job?.status === 'ANALYZING' && streamingReport && (
+            <div className="mt-8 p-6 bg-gray-800/30 border border-gray-700/50 rounded-lg prose prose-invert max-w-none animate-fade-in">
+              <ReactMarkdown>{streamingReport}</ReactMarkdown>
+            </div>
+          )}
+
           {job?.status === 'SUCCESS' && job.result && (
             <ResultsDisplay result={job.result} />
           )}
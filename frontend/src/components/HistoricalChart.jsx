@@ -1,25 +1,17 @@
 import React, { useState, useEffect } from 'react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
-import axios from 'axios';
-
-const PROXY_URL = 'https://api.allorigins.win/raw?url=';
+import { getTickerHistory } from '../services/api';
 
 const fetchHistoricalData = async (ticker) => {
-    const yahooUrl = `https://query1.finance.yahoo.com/v8/finance/chart/${ticker}?range=100d&interval=1d`;
-    const encodedUrl = encodeURIComponent(yahooUrl);
-    
     try {
-        const response = await axios.get(PROXY_URL + encodedUrl);
-        const data = response.data.chart.result[0];
-        const timestamps = data.timestamp;
-        const prices = data.indicators.quote[0].close;
-
-        return timestamps
-            .map((ts, i) => ({
-                date: new Date(ts * 1000).toLocaleDateString('en-IN', {day: 'numeric', month: 'short'}),
-                price: prices[i] ? prices[i].toFixed(2) : null,
-            }))
-            .filter(point => point.price !== null);
+        // Served from the backend's OHLCV store, already downsampled for the chart
+        const response = await getTickerHistory(ticker, { period: '100d', points: 300 });
+        const { date, close } = response.data;
+
+        return date.map((day, i) => ({
+            date: new Date(day).toLocaleDateString('en-IN', {day: 'numeric', month: 'short'}),
+            price: close[i].toFixed(2),
+        }));
 
     } catch (error) {
         console.error("Failed to fetch historical data for chart:", error);
@@ -1,17 +1,20 @@
 import React, { useState, useEffect } from 'react';
-import { getJobsHistory } from '../services/api';
+import { getJob, getJobsHistory } from '../services/api';
 import { History, LoaderCircle } from 'lucide-react';
 
 function HistoryPanel({ onSelectJob }) {
   const [history, setHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [isOpen, setIsOpen] = useState(false);
 
-  const fetchHistory = () => {
+  // The history endpoint returns summaries only; the full result is fetched on selection.
+  const fetchHistory = (cursor = null) => {
     setIsLoading(true);
-    getJobsHistory()
+    getJobsHistory({ status: 'SUCCESS,FAILED', limit: 20, ...(cursor ? { cursor } : {}) })
       .then(response => {
-        setHistory(response.data.filter(job => job.status === 'SUCCESS' || job.status === 'FAILED'));
+        setHistory(prev => (cursor ? [...prev, ...response.data.items] : response.data.items));
+        setNextCursor(response.data.next_cursor);
       })
       .catch(error => console.error("Failed to fetch history:", error))
       .finally(() => setIsLoading(false));
@@ -26,7 +29,9 @@ function HistoryPanel({ onSelectJob }) {
   };
 
   const handleSelect = (job) => {
-    onSelectJob(job);
+    getJob(job.id)
+      .then(response => onSelectJob(response.data))
+      .catch(error => console.error("Failed to fetch job:", error));
     setIsOpen(false);
   }
 
@@ -48,7 +53,7 @@ function HistoryPanel({ onSelectJob }) {
           <button onClick={() => setIsOpen(false)} className="text-gray-400 hover:text-white text-3xl">&times;</button>
         </div>
         <div className="p-4 overflow-y-auto h-[calc(100%-4rem)]">
-          {isLoading ? (
+          {isLoading && history.length === 0 ? (
             <div className="flex justify-center items-center h-full pt-20">
               <LoaderCircle className="w-8 h-8 animate-spin text-green-400" />
             </div>
@@ -72,6 +77,17 @@ function HistoryPanel({ onSelectJob }) {
                   </div>
                 </li>
               ))}
+              {nextCursor && (
+                <li>
+                  <button
+                    onClick={() => fetchHistory(nextCursor)}
+                    disabled={isLoading}
+                    className="w-full p-2 text-sm text-gray-400 hover:text-white border border-gray-700 rounded-md"
+                  >
+                    {isLoading ? 'Loading...' : 'Load more'}
+                  </button>
+                </li>
+              )}
             </ul>
           )}
         </div>
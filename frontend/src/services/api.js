@@ -7,6 +7,26 @@ const apiClient = axios.create({
   headers: { 'Content-Type': 'application/json' },
 });
 
-export const createJob = (ticker) => apiClient.post('/jobs', { ticker });
+export const createJob = (ticker, forceRefresh = false) =>
+  apiClient.post('/jobs', { ticker, force_refresh: forceRefresh });
 export const getJob = (jobId) => apiClient.get(`/jobs/${jobId}`);
-export const getJobsHistory = () => apiClient.get('/jobs');
\ No newline at end of file
+export const getJobsHistory = (params = {}) => apiClient.get('/jobs', { params });
+export const getTickerHistory = (ticker, params = {}) =>
+  apiClient.get(`/tickers/${encodeURIComponent(ticker)}/history`, { params });
+// Streams job updates over Server-Sent Events. Returns a function that closes the stream.
+// onReport gets the analyst report text as it is generated.
+export const subscribeToJob = (jobId, onUpdate, onError, onReport = () => {}) => {
+  const source = new EventSource(`${API_URL}/jobs/${jobId}/events`);
+  let report = '';
+  source.onmessage = (event) => onUpdate(JSON.parse(event.data));
+  source.addEventListener('report', (event) => {
+    const { offset, delta } = JSON.parse(event.data);
+    report = report.slice(0, offset) + delta;
+    onReport(report);
+  });
+  source.onerror = (err) => {
+    source.close();
+    onError(err);
+  };
+  return () => source.close();
+};
@@ -6,8 +6,8 @@ redis-server --daemonize yes --save "" --appendonly no
 
 echo "Redis started with persistence disabled."
 
-# Start the Celery worker in the background
-celery -A celery_worker.celery worker --loglevel=info &
+# Start the Celery worker in the background (one worker serving every queue)
+celery -A celery_worker.celery worker -Q io,cpu,sentiment --loglevel=info &
 
 echo "Celery worker started."
 